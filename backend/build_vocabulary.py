@@ -0,0 +1,58 @@
+import os
+import argparse
+from collections import Counter
+from pathlib import Path
+from opensearchpy import helpers
+from main import INDEX_NAME, SPELLING_VOCABULARY_FILE, client
+from spelling import tokenize, write_vocabulary
+
+
+def count_words(index_name=INDEX_NAME, lang=None, batch_size=2000):
+    """Stream every non-boilerplate segment's text and count its words."""
+    filters = [{"term": {"language_code": lang}}] if lang else []
+    query = {
+        "query": {"bool": {"filter": filters, "must_not": [{"term": {"boilerplate": True}}]}},
+        "_source": ["text"],
+    }
+    counts = Counter()
+    docs = 0
+    for hit in helpers.scan(client, index=index_name, query=query, size=batch_size, request_timeout=60):
+        counts.update(tokenize(hit["_source"].get("text")))
+        docs += 1
+        if docs % 100000 == 0:
+            print(f"Read {docs} segments, {len(counts)} distinct words")
+    return counts, docs
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Build the spelling vocabulary used for /search \"did you mean\" suggestions",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Run after ingestion alongside precompute.py; the backend loads the file at startup.
+
+Examples:
+  python build_vocabulary.py                        # All languages, top 30000 words
+  python build_vocabulary.py --min-count 5 --max-words 50000
+  python build_vocabulary.py --index youtube-transcripts-en
+        """
+    )
+    parser.add_argument("--index", default=INDEX_NAME, help="Index or alias to read")
+    parser.add_argument("--lang", help="Only count segments with this language_code")
+    parser.add_argument("--min-count", type=int, default=2, help="Drop words seen fewer times (mostly caption typos)")
+    parser.add_argument("--max-words", type=int, default=30000,
+                        help="Keep at most this many of the most frequent words (each backend worker "
+                             "needs about 50MB per 30000; see SPELLING_MAX_WORDS)")
+    parser.add_argument("--output", type=Path, default=SPELLING_VOCABULARY_FILE, help="Vocabulary file to write")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    counts, docs = count_words(args.index, args.lang)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = args.output.with_suffix(args.output.suffix + ".tmp")
+    kept = write_vocabulary(tmp_file, counts, args.index, args.min_count, args.max_words)
+    os.replace(tmp_file, args.output)
+    print(f"Wrote {kept} of {len(counts)} distinct words from {docs} segments to {args.output}")
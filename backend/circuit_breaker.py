@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the cluster while the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through and their outcomes are recorded in a sliding
+    window. A call is bad when it fails or takes longer than slow_call_seconds.
+    Once the window holds min_calls outcomes and the bad rate reaches
+    failure_rate_threshold, the circuit opens.
+
+    Open: calls are rejected immediately for open_seconds.
+
+    Half-open: up to half_open_max_calls probes are let through. If they all
+    succeed the circuit closes; any bad probe re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window_size=50, min_calls=10, failure_rate_threshold=0.5,
+                 slow_call_seconds=3.0, open_seconds=15.0, half_open_max_calls=2):
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.lock = threading.Lock()
+        self.outcomes = deque(maxlen=window_size)
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.half_open_in_flight = 0
+        self.half_open_successes = 0
+
+    def _trip(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.outcomes.clear()
+        print("Circuit breaker opened")
+
+    def _close(self):
+        self.state = self.CLOSED
+        self.outcomes.clear()
+        print("Circuit breaker closed")
+
+    def is_open(self):
+        """True while requests would be rejected (open and still cooling down)."""
+        with self.lock:
+            return self.state == self.OPEN and time.monotonic() - self.opened_at < self.open_seconds
+
+    def allow_request(self):
+        with self.lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+                self.half_open_in_flight = 0
+                self.half_open_successes = 0
+            if self.state == self.HALF_OPEN:
+                if self.half_open_in_flight >= self.half_open_max_calls:
+                    return False
+                self.half_open_in_flight += 1
+            return True
+
+    def release(self):
+        """
+        End a call that says nothing about the cluster's health (e.g. it
+        rejected a bad request) without recording an outcome.
+        """
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.half_open_in_flight = max(0, self.half_open_in_flight - 1)
+
+    def record(self, success, duration):
+        bad = not success or duration >= self.slow_call_seconds
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.half_open_in_flight = max(0, self.half_open_in_flight - 1)
+                if bad:
+                    self._trip()
+                else:
+                    self.half_open_successes += 1
+                    if self.half_open_successes >= self.half_open_max_calls:
+                        self._close()
+                return
+            if self.state == self.OPEN:
+                return
+            self.outcomes.append(bad)
+            if len(self.outcomes) >= self.min_calls:
+                failure_rate = sum(self.outcomes) / len(self.outcomes)
+                if failure_rate >= self.failure_rate_threshold:
+                    self._trip()
+
+    def snapshot(self):
+        with self.lock:
+            outcomes = list(self.outcomes)
+            return {
+                "state": self.state,
+                "window_calls": len(outcomes),
+                "failure_rate": round(sum(outcomes) / len(outcomes), 3) if outcomes else 0.0,
+            }
+
+
+class LastGoodCache:
+    """Bounded LRU of the last successful payload per request key."""
+
+    def __init__(self, capacity=5000):
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (payload, stored_at)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, payload):
+        with self.lock:
+            self.entries[key] = (payload, time.time())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,114 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; fall back to gzip only
+    brotli = None
+
+
+def parse_accept_encoding(header_value):
+    """Return the set of encodings the client accepts (q=0 entries excluded)."""
+    accepted = set()
+    for part in header_value.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(token)
+    return accepted
+
+
+def choose_encoding(header_value):
+    accepted = parse_accept_encoding(header_value or "")
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def add_vary_accept_encoding(headers):
+    """Merge Accept-Encoding into the Vary header (ASGI header list), keeping other entries."""
+    vary = [v for k, v in headers if k.lower() == b"vary"]
+    if any(b"accept-encoding" in v.lower() for v in vary):
+        return headers
+    vary.append(b"Accept-Encoding")
+    return [(k, v) for k, v in headers if k.lower() != b"vary"] + [(b"vary", b", ".join(vary))]
+
+
+class CompressionMiddleware:
+    """
+    Compress buffered HTTP responses with brotli or gzip, negotiated from the
+    request's Accept-Encoding header. Responses smaller than minimum_size, or
+    that already carry a Content-Encoding, are passed through uncompressed.
+    Every response carries Vary: Accept-Encoding, so a shared cache never
+    serves one client's uncompressed variant to another.
+    """
+
+    def __init__(self, app, minimum_size=1024, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        encoding = choose_encoding(request_headers.get("accept-encoding"))
+        if encoding is None:
+            async def send_with_vary(message):
+                if message["type"] == "http.response.start":
+                    message = {**message, "headers": add_vary_accept_encoding(list(message.get("headers", [])))}
+                await send(message)
+
+            await self.app(scope, receive, send_with_vary)
+            return
+
+        start_message = None
+        body_parts = []
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(body_parts)
+            headers = list(start_message.get("headers", []))
+            header_names = {k.lower() for k, _ in headers}
+            if len(body) < self.minimum_size or b"content-encoding" in header_names:
+                await send({**start_message, "headers": add_vary_accept_encoding(headers)})
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            if encoding == "br":
+                compressed = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                compressed = gzip.compress(body, compresslevel=self.gzip_level)
+
+            headers = [(k, v) for k, v in add_vary_accept_encoding(headers) if k.lower() != b"content-length"]
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
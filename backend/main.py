@@ -1,18 +1,33 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from concurrent.futures import ThreadPoolExecutor
+from fastapi.responses import ORJSONResponse
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from opensearchpy import OpenSearch, RequestsHttpConnection
+from opensearchpy.exceptions import ConnectionError as OpenSearchConnectionError, TransportError
 from dotenv import load_dotenv
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List, Optional
 import os
+import re
 import json
+import hashlib
+import time
+import threading
+import orjson
 from datetime import datetime
 from pathlib import Path
 
-app = FastAPI()
-
+# Before the local imports: profiling reads its settings at import time
 load_dotenv()
 
+from compression import CompressionMiddleware
+from query_log import QueryLog, normalize_query
+from circuit_breaker import CircuitBreaker, CircuitOpenError, LastGoodCache
+from spelling import SymSpell, load_vocabulary
+from profiling import ProfilingMiddleware, install_query_profiling, profiled, propagate
+
+app = FastAPI(default_response_class=ORJSONResponse)
+
 # Get allowed origins from environment variable for production
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
 
@@ -24,8 +39,76 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in request profiling (PROFILE_ADMIN_TOKEN header or PROFILE_SAMPLE_RATE);
+# added first so it runs inside compression and sees the plain JSON body
+app.add_middleware(ProfilingMiddleware)
+
+# Compress JSON responses above this size (bytes) with brotli or gzip
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+# Seconds clients and CDNs may cache successful search responses
+SEARCH_CACHE_MAX_AGE = int(os.getenv("SEARCH_CACHE_MAX_AGE", "300"))
+AUTOCOMPLETE_CACHE_MAX_AGE = int(os.getenv("AUTOCOMPLETE_CACHE_MAX_AGE", "60"))
+
 executor = ThreadPoolExecutor(max_workers=4)
 
+# Global read alias over every language's versioned transcript index; each
+# language also has its own alias, e.g. youtube-transcripts-en
+# (see ingestion/ec2_opensearch/reindex.py)
+INDEX_NAME = os.getenv("OPENSEARCH_READ_ALIAS", "youtube-transcripts")
+
+# Seconds the list of existing per-language aliases is reused before re-reading it
+LANGUAGE_ALIAS_TTL_SECONDS = int(os.getenv("LANGUAGE_ALIAS_TTL_SECONDS", "60"))
+language_aliases = {"names": set(), "checked_at": None}
+
+def primary_language(lang: Optional[str] = None):
+    """Reduce a language code ("en-GB") to the routing key ("en"), or None for all languages."""
+    if not lang:
+        return None
+    primary = lang.split("-")[0].split("_")[0].strip().lower()
+    if not re.fullmatch(r"[a-z]{2,3}", primary):
+        raise HTTPException(status_code=400, detail=f"Invalid language code: {lang}")
+    return primary
+
+def existing_language_aliases():
+    """Names of the per-language read aliases, re-read at most every LANGUAGE_ALIAS_TTL_SECONDS."""
+    now = time.monotonic()
+    checked_at = language_aliases["checked_at"]
+    if checked_at is not None and (now - checked_at < LANGUAGE_ALIAS_TTL_SECONDS or breaker.is_open()):
+        return language_aliases["names"]
+    language_aliases["checked_at"] = now
+    try:
+        resp = client.indices.get_alias(name=f"{INDEX_NAME}-*", ignore=404, request_timeout=2)
+        language_aliases["names"] = {
+            alias for entry in resp.values() if isinstance(entry, dict)
+            for alias in entry.get("aliases", {})
+        }
+    except Exception as e:
+        # Keep the last known aliases; languages missing from them fall back to filtering
+        print(f"Error reading language aliases: {e}")
+    return language_aliases["names"]
+
+def search_index(lang: Optional[str] = None):
+    """
+    Return (index, filters) to query: one language's read alias when lang is
+    given and that alias exists, else the global alias, filtered by
+    language_code when lang is given. Languages never ingested, and every
+    language while transcripts still go to the legacy unversioned index, take
+    the filtered path.
+    """
+    primary = primary_language(lang)
+    if primary is None:
+        return INDEX_NAME, []
+    alias = f"{INDEX_NAME}-{primary}"
+    if alias in existing_language_aliases():
+        return alias, []
+    return INDEX_NAME, [{"bool": {"should": [
+        {"term": {"language_code": primary}},
+        {"prefix": {"language_code": f"{primary}-"}},
+        {"prefix": {"language_code": f"{primary}_"}},
+    ], "minimum_should_match": 1}}]
+
 EC2_OPENSEARCH_HOST = os.getenv("EC2_OPENSEARCH_HOST", "localhost")
 EC2_OPENSEARCH_PORT = os.getenv("EC2_OPENSEARCH_PORT", "9200")
 EC2_OPENSEARCH_USERNAME = os.getenv("EC2_OPENSEARCH_USERNAME", "admin")
@@ -33,86 +116,592 @@ EC2_OPENSEARCH_PASSWORD = os.getenv("EC2_OPENSEARCH_PASSWORD", "YourStrongPasswo
 EC2_OPENSEARCH_USE_SSL = os.getenv("EC2_OPENSEARCH_USE_SSL", "false").lower() == "true"
 EC2_OPENSEARCH_VERIFY_CERTS = os.getenv("EC2_OPENSEARCH_VERIFY_CERTS", "false").lower() == "true"
 
+# Client-side timeout for every OpenSearch request
+OPENSEARCH_TIMEOUT_SECONDS = 10
+
 client = OpenSearch(
     hosts=[{"host": EC2_OPENSEARCH_HOST, "port": EC2_OPENSEARCH_PORT}],
     http_auth=(EC2_OPENSEARCH_USERNAME, EC2_OPENSEARCH_PASSWORD),
     use_ssl=EC2_OPENSEARCH_USE_SSL,
     verify_certs=EC2_OPENSEARCH_VERIFY_CERTS,
     connection_class=RequestsHttpConnection,
-    timeout=10,
+    timeout=OPENSEARCH_TIMEOUT_SECONDS,
 )
+# Searches made while a request is profiled also return OpenSearch's query profile
+install_query_profiling(client)
+
+def cacheable_response(request: Request, payload: dict, max_age: int, extra_headers: Optional[dict] = None):
+    """
+    Serialize payload with orjson and attach Cache-Control/ETag headers.
+    Error and stale payloads are marked no-store so a cluster hiccup is never cached.
+    Returns 304 when the client's If-None-Match matches the current ETag.
+    """
+    body = orjson.dumps(payload)
+    if payload.get("error") or payload.get("stale"):
+        return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-store", **(extra_headers or {})})
+
+    etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}", **(extra_headers or {})}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.get("/")
 def read_root():
     return {"message": "FastAPI + OpenSearch connected successfully"}
 
-@app.get("/search")
-def search(q: str, size: int = 25):
-    def do_search():
-        fetch_size = max(size * 3, size)
-        body = {"query": {"match": {"text": q}}, "size": fetch_size}
-        return client.search(index="youtube-transcripts", body=body)
+# Circuit breaker around every OpenSearch call: when the cluster is failing or
+# slow, requests fail fast and are answered from the last known good response
+breaker = CircuitBreaker(
+    window_size=int(os.getenv("BREAKER_WINDOW_SIZE", "50")),
+    min_calls=int(os.getenv("BREAKER_MIN_CALLS", "10")),
+    failure_rate_threshold=float(os.getenv("BREAKER_FAILURE_RATE", "0.5")),
+    slow_call_seconds=float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "3")),
+    open_seconds=float(os.getenv("BREAKER_OPEN_SECONDS", "15")),
+    half_open_max_calls=int(os.getenv("BREAKER_HALF_OPEN_CALLS", "2")),
+)
+last_good = LastGoodCache(capacity=int(os.getenv("LAST_GOOD_CACHE_SIZE", "5000")))
+refresh_executor = ThreadPoolExecutor(max_workers=2)
+refreshing = set()
+refreshing_lock = threading.Lock()
+
+def is_cluster_failure(error):
+    """
+    True for errors that say the cluster is unhealthy: unreachable, timing out
+    or answering 5xx. Client errors (a missing index, an invalid size) are
+    the caller's fault and must not open the breaker.
+    """
+    if isinstance(error, (OpenSearchConnectionError, FutureTimeoutError)):
+        return True
+    return isinstance(error, TransportError) and isinstance(error.status_code, int) and error.status_code >= 500
 
+def cluster_call(fn, timeout):
+    """Run fn on the executor through the circuit breaker, recording its outcome and latency."""
+    if not breaker.allow_request():
+        raise CircuitOpenError("Search is temporarily unavailable")
+    started = time.monotonic()
     try:
-        resp = executor.submit(do_search).result(timeout=15)
-        seen = set()
-        results = []
-        for hit in resp["hits"]["hits"]:
-            src = hit["_source"]
-            vid = src.get("video_id")
-            if not vid or vid in seen:
-                continue
-            seen.add(vid)
+        result = executor.submit(propagate(fn)).result(timeout=timeout)
+    except Exception as e:
+        if is_cluster_failure(e):
+            breaker.record(False, time.monotonic() - started)
+        else:
+            breaker.release()
+        raise
+    breaker.record(True, time.monotonic() - started)
+    return result
+
+def schedule_refresh(key, compute):
+    """Recompute a stale entry in the background; at most one refresh per key at a time."""
+    with refreshing_lock:
+        if key in refreshing:
+            return
+        refreshing.add(key)
+
+    def refresh():
+        try:
+            payload = compute()
+            if not payload.get("error"):
+                last_good.put(key, payload)
+        finally:
+            with refreshing_lock:
+                refreshing.discard(key)
+
+    refresh_executor.submit(refresh)
+
+def serve_resilient(key, compute):
+    """
+    Return (payload, cache_status). While the circuit is open, or when the
+    cluster call fails, serve the last known good payload marked stale and
+    refresh it in the background.
+    """
+    cached = last_good.get(key)
+    if cached is not None and breaker.is_open():
+        schedule_refresh(key, compute)
+        return {**cached[0], "stale": True, "cached_at": cached[1]}, "STALE"
+
+    payload = compute()
+    if payload.get("error"):
+        if cached is not None:
+            schedule_refresh(key, compute)
+            return {**cached[0], "stale": True, "cached_at": cached[1]}, "STALE"
+        return payload, "MISS"
+    last_good.put(key, payload)
+    return payload, "MISS"
+
+# Fields each kind of query reads back; fetching only these keeps responses
+# small (boilerplate, segment_index and the mapping's other fields stay behind)
+RESULT_SOURCE = ["video_id", "language_code", "start_time", "end_time", "text", "previous"]
+CONTEXT_SOURCE = ["start_time", "end_time", "text", "language_code"]
+
+def build_metadata_filters(channel: Optional[str] = None, published_after: Optional[str] = None,
+                           max_duration: Optional[int] = None):
+    """
+    Filter clauses on the video metadata stored with each segment. They run in
+    filter context: unscored, and cached per segment by OpenSearch, so narrowed
+    searches get cheaper rather than more expensive.
+    """
+    filters = []
+    if channel:
+        # Channel ID or its display name
+        filters.append({"bool": {"should": [
+            {"term": {"channel_id": channel}},
+            {"term": {"channel_title": channel}},
+        ], "minimum_should_match": 1}})
+    if published_after:
+        try:
+            datetime.fromisoformat(published_after.replace("Z", "+00:00"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="published_after must be an ISO 8601 date")
+        filters.append({"range": {"published_at": {"gte": published_after}}})
+    if max_duration is not None:
+        if max_duration <= 0:
+            raise HTTPException(status_code=400, detail="max_duration must be a positive number of seconds")
+        filters.append({"range": {"duration_seconds": {"lte": max_duration}}})
+    return filters
+
+def build_search_body(q, size, filters=None):
+    # Over-fetch so there are enough distinct videos left after de-duplication
+    fetch_size = max(size * 3, size)
+    return {
+        "query": {
+            "bool": {
+                "must": [{"match": {"text": q}}],
+                "filter": filters or [],
+                # Repeated intros/outros/sponsor reads flagged at ingestion (ingestion/ec2_opensearch/dedupe.py)
+                "must_not": [{"term": {"boilerplate": True}}],
+            }
+        },
+        "size": fetch_size,
+        "_source": RESULT_SOURCE,
+    }
+
+def stored_previous(src):
+    """Context stored on the document at ingestion time, if any."""
+    prev = src.get("previous")
+    if not prev:
+        return None
+    return {
+        "start_time": prev.get("start_time"),
+        "end_time": prev.get("end_time"),
+        "text": prev.get("text"),
+        "language_code": src.get("language_code"),
+    }
 
-            # Find the immediately previous segment for this video (same language if available)
-            prev = None
+def hit_to_result(hit):
+    src = hit["_source"]
+    return {
+        "video_id": src.get("video_id"),
+        "language_code": src.get("language_code"),
+        "start_time": src.get("start_time"),
+        "end_time": src.get("end_time"),
+        "text": src.get("text"),
+        "score": hit.get("_score"),
+        "previous": stored_previous(src),
+    }
+
+def collect_results(hits, size):
+    """
+    Keep the best hit per video, up to size results. Context comes from the
+    document when ingestion stored it; otherwise attach_previous_segments looks it up.
+    """
+    seen = set()
+    results = []
+    for hit in hits:
+        vid = hit["_source"].get("video_id")
+        if not vid or vid in seen:
+            continue
+        seen.add(vid)
+        results.append(hit_to_result(hit))
+        if len(results) >= size:
+            break
+    return results
+
+def previous_segment_query(result):
+    # Find the immediately previous segment for this video (same language if available)
+    vid = result.get("video_id")
+    lang = result.get("language_code")
+    start = result.get("start_time")
+    if result.get("previous") or not vid or not isinstance(start, (int, float)):
+        return None
+    return {
+        "query": {
+            "bool": {
+                "must": [{"term": {"video_id": vid}}] + ([{"term": {"language_code": lang}}] if lang else []),
+                "filter": [{"range": {"start_time": {"lt": start}}}],
+            }
+        },
+        "sort": [{"start_time": {"order": "desc"}}],
+        "size": 1,
+        "_source": CONTEXT_SOURCE,
+    }
+
+def attach_previous_segments(results, index=INDEX_NAME, indices=None):
+    """
+    Fill in the "previous" context for every result with a single _msearch
+    round trip. indices, when given, names the index each result was found
+    in and overrides index.
+    """
+    pending = []
+    msearch_body = []
+    for i, result in enumerate(results):
+        prev_query = previous_segment_query(result)
+        if prev_query is None:
+            continue
+        pending.append(result)
+        msearch_body.extend([{"index": indices[i] if indices else index}, prev_query])
+    if not pending:
+        return results
+
+    try:
+        resp = client.msearch(body=msearch_body)
+    except Exception:
+        return results
+
+    for result, prev_resp in zip(pending, resp.get("responses", [])):
+        prev_hits = prev_resp.get("hits", {}).get("hits", [])
+        if prev_hits:
+            prev_src = prev_hits[0].get("_source", {})
+            result["previous"] = {
+                "start_time": prev_src.get("start_time"),
+                "end_time": prev_src.get("end_time"),
+                "text": prev_src.get("text"),
+                "language_code": prev_src.get("language_code"),
+            }
+    return results
+
+# "Did you mean" suggestions from a vocabulary of the indexed transcripts
+# (generate with: python build_vocabulary.py). /search responses with fewer
+# than SPELLING_MIN_HITS results carry a corrected query when one exists.
+# The deletion index is built in every worker process: at edit distance 2 it
+# takes about 50MB and 1s per 30000 words, and grows faster than linearly.
+# SPELLING_MAX_WORDS keeps only that many of the vocabulary's most frequent
+# words; distance 1 needs about a third of the memory but misses more typos.
+SPELLING_VOCABULARY_FILE = Path(os.getenv("SPELLING_VOCABULARY_FILE", "data/vocabulary.json.gz"))
+SPELLING_MAX_EDIT_DISTANCE = int(os.getenv("SPELLING_MAX_EDIT_DISTANCE", "2"))
+SPELLING_MAX_WORDS = int(os.getenv("SPELLING_MAX_WORDS", "30000"))
+SPELLING_MIN_HITS = int(os.getenv("SPELLING_MIN_HITS", "3"))
+
+spelling = {"checker": None}
+
+def load_spelling():
+    try:
+        words = load_vocabulary(SPELLING_VOCABULARY_FILE, SPELLING_MAX_WORDS)
+    except FileNotFoundError:
+        print(f"No spelling vocabulary at {SPELLING_VOCABULARY_FILE}; suggestions disabled")
+        return
+    except Exception as e:
+        print(f"Error reading spelling vocabulary: {e}")
+        return
+    spelling["checker"] = SymSpell(words, max_edit_distance=SPELLING_MAX_EDIT_DISTANCE)
+    print(f"Loaded spelling vocabulary ({len(words)} words)")
+
+def spelling_suggestion(q: str):
+    checker = spelling["checker"]
+    return checker.correct(q) if checker is not None else None
+
+def run_search(q: str, size: int = 25, lang: Optional[str] = None, autocorrect: bool = False, filters=None):
+    """
+    Run a phrase search with context and return the /search payload. The
+    spelling suggestion is computed in memory. With autocorrect, the
+    corrected search only runs when the original came back thin, so words
+    missing from the vocabulary (rare names, slang) that do match transcripts
+    cost no second query.
+    """
+    index, language_filters = search_index(lang)
+    filters = (filters or []) + language_filters
+    suggestion = spelling_suggestion(q)
+
+    def do_search():
+        resp = client.search(index=index, body=build_search_body(q, size, filters))
+        results = collect_results(resp["hits"]["hits"], size)
+        corrected_results = []
+        if suggestion and autocorrect and len(results) < SPELLING_MIN_HITS:
             try:
-                lang = src.get("language_code")
-                start = src.get("start_time")
-                if isinstance(start, (int, float)):
-                    prev_query = {
-                        "query": {
-                            "bool": {
-                                "must": [{"term": {"video_id": vid}}] + ([{"term": {"language_code": lang}}] if lang else []),
-                                "filter": [{"range": {"start_time": {"lt": start}}}],
-                            }
-                        },
-                        "sort": [{"start_time": {"order": "desc"}}],
-                        "size": 1,
-                    }
-                    prev_resp = client.search(index="youtube-transcripts", body=prev_query)
-                    prev_hits = prev_resp.get("hits", {}).get("hits", [])
-                    if prev_hits:
-                        prev_src = prev_hits[0].get("_source", {})
-                        prev = {
-                            "start_time": prev_src.get("start_time"),
-                            "end_time": prev_src.get("end_time"),
-                            "text": prev_src.get("text"),
-                            "language_code": prev_src.get("language_code"),
-                        }
-            except Exception:
-                prev = None
+                corrected = client.search(index=index, body=build_search_body(suggestion, size, filters))
+                corrected_results = collect_results(corrected["hits"]["hits"], size)
+            except Exception as e:
+                print(f"Corrected search failed for {suggestion!r}: {e}")
+        attach_previous_segments(results + corrected_results, index)
+        return results, corrected_results
 
-            results.append({
-                "video_id": vid,
-                "language_code": src.get("language_code"),
-                "start_time": src.get("start_time"),
-                "end_time": src.get("end_time"),
-                "text": src.get("text"),
-                "score": hit.get("_score"),
-                "previous": prev,
-            })
-            if len(results) >= size:
-                break
-        return {"query": q, "count": len(results), "results": results}
+    try:
+        results, corrected_results = cluster_call(do_search, timeout=15)
     except Exception as e:
         return {"query": q, "error": str(e), "results": []}
 
-@app.get("/autocomplete")
-def autocomplete(q: str, size: int = 5):
-    if len(q.strip()) < 2:  # Don't suggest for very short queries
-        return {"query": q, "suggestions": []}
-    
+    payload = {"query": q, "count": len(results), "results": results}
+    if suggestion and len(results) < SPELLING_MIN_HITS:
+        payload["did_you_mean"] = suggestion
+        if autocorrect:
+            payload["corrected"] = {"query": suggestion, "count": len(corrected_results), "results": corrected_results}
+    return payload
+
+# Precomputed /search responses for the most popular phrases, written by
+# precompute.py after each ingestion run and served without touching the cluster
+PRECOMPUTED_FILE = Path(os.getenv("PRECOMPUTED_FILE", "data/precomputed_search.json"))
+PRECOMPUTED_RELOAD_SECONDS = int(os.getenv("PRECOMPUTED_RELOAD_SECONDS", "60"))
+# Number of popular phrases replayed against the cluster at startup to warm its
+# caches, and the most seconds warm-up may hold back readiness
+WARMUP_QUERIES = int(os.getenv("WARMUP_QUERIES", "50"))
+WARMUP_DEADLINE_SECONDS = float(os.getenv("WARMUP_DEADLINE_SECONDS", "60"))
+
+precomputed = {"results": {}, "phrases": [], "mtime": None, "checked_at": 0.0}
+readiness = {"ready": False, "warmed_queries": 0}
+
+def precompute_key(q: str, size: int, lang: Optional[str] = None):
+    return f"{normalize_query(q)}|{size}|{(lang or '').lower()}"
+
+def load_precomputed_results(force: bool = False):
+    """(Re)load the precomputed file when it has changed, at most every PRECOMPUTED_RELOAD_SECONDS."""
+    now = time.monotonic()
+    if not force and now - precomputed["checked_at"] < PRECOMPUTED_RELOAD_SECONDS:
+        return
+    precomputed["checked_at"] = now
+    try:
+        mtime = PRECOMPUTED_FILE.stat().st_mtime
+    except FileNotFoundError:
+        return
+    if mtime == precomputed["mtime"]:
+        return
+    try:
+        with open(PRECOMPUTED_FILE, "rb") as f:
+            data = orjson.loads(f.read())
+        precomputed["results"] = data.get("results", {})
+        precomputed["phrases"] = data.get("phrases", [])
+        precomputed["mtime"] = mtime
+        print(f"Loaded {len(precomputed['results'])} precomputed search responses")
+    except Exception as e:
+        print(f"Error reading precomputed search file: {e}")
+
+def get_precomputed(q: str, size: int, lang: Optional[str] = None):
+    load_precomputed_results()
+    payload = precomputed["results"].get(precompute_key(q, size, lang))
+    if payload is None:
+        return None
+    return {**payload, "query": q}
+
+def warm_up():
+    """
+    Replay the most popular phrases so the cluster's caches are hot, then
+    report ready. Queries go through the circuit breaker, and warm-up gives up
+    once it opens or WARMUP_DEADLINE_SECONDS pass, so a down cluster only
+    briefly delays readiness and requests are served stale meanwhile.
+    """
+    deadline = time.monotonic() + WARMUP_DEADLINE_SECONDS
+    for phrase in precomputed["phrases"][:WARMUP_QUERIES]:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            print("Warm-up deadline reached")
+            break
+        if not breaker.allow_request():
+            print("Warm-up stopped: circuit breaker is open")
+            break
+        started = time.monotonic()
+        try:
+            client.search(index=INDEX_NAME, body=build_search_body(phrase, 25), request_timeout=min(5, remaining))
+        except Exception as e:
+            if is_cluster_failure(e):
+                breaker.record(False, time.monotonic() - started)
+            else:
+                breaker.release()
+            print(f"Warm-up query failed for {phrase!r}: {e}")
+            continue
+        breaker.record(True, time.monotonic() - started)
+        readiness["warmed_queries"] += 1
+    readiness["ready"] = True
+    print(f"Warm-up complete ({readiness['warmed_queries']} queries)")
+
+# What learners search for: events are buffered in memory and written in
+# batches to rotating gzip files by a background thread
+query_log = QueryLog(
+    log_dir=os.getenv("QUERY_LOG_DIR", "data/query_logs"),
+    buffer_size=int(os.getenv("QUERY_LOG_BUFFER_SIZE", "10000")),
+    flush_interval=float(os.getenv("QUERY_LOG_FLUSH_SECONDS", "5")),
+    rotate_bytes=int(os.getenv("QUERY_LOG_ROTATE_MB", "50")) * 1024 * 1024,
+    sketch_capacity=int(os.getenv("QUERY_LOG_TOPK_CAPACITY", "1000")),
+)
+
+@app.on_event("startup")
+def on_startup():
+    load_precomputed_results(force=True)
+    query_log.start()
+    # On its own thread so request workers in the executor stay free
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    # Building the deletion index takes a few seconds; search works without it meanwhile
+    threading.Thread(target=load_spelling, daemon=True).start()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    query_log.stop()
+
+@app.get("/ready")
+def ready():
+    if not readiness["ready"]:
+        return ORJSONResponse(status_code=503, content={"ready": False, **readiness})
+    return {
+        "precomputed": len(precomputed["results"]),
+        "last_good_cached": len(last_good),
+        "spelling_words": len(spelling["checker"]) if spelling["checker"] is not None else 0,
+        "circuit": breaker.snapshot(),
+        **readiness,
+    }
+
+@app.get("/search")
+@profiled
+def search(request: Request, q: str, size: int = 25, lang: Optional[str] = None, autocorrect: bool = False,
+           channel: Optional[str] = None, published_after: Optional[str] = None, max_duration: Optional[int] = None):
+    started = time.perf_counter()
+    filters = build_metadata_filters(channel, published_after, max_duration)
+    # Precomputed responses are unfiltered and built without spelling data, so
+    # they can't carry a corrected search or a "did you mean" for a thin result
+    payload = None if filters or autocorrect else get_precomputed(q, size, lang)
+    if payload is not None and len(payload["results"]) < SPELLING_MIN_HITS and spelling_suggestion(q):
+        payload = None
+    cache_status = "PRECOMPUTED"
+    if payload is None:
+        key = f"search|{precompute_key(q, size, lang)}|{autocorrect}|{channel}|{published_after}|{max_duration}"
+        payload, cache_status = serve_resilient(key, lambda: run_search(q, size, lang, autocorrect, filters))
+    query_log.emit(
+        "search", q,
+        lang=lang,
+        size=size,
+        hits=len(payload["results"]),
+        latency_ms=round((time.perf_counter() - started) * 1000, 2),
+        cache=cache_status,
+        error=bool(payload.get("error")),
+        corrected=payload.get("did_you_mean"),
+        filtered=bool(filters),
+    )
+    return cacheable_response(request, payload, SEARCH_CACHE_MAX_AGE, {"X-Cache": cache_status})
+
+@app.get("/popular")
+def popular(k: int = 20, endpoint: str = "search"):
+    """Most frequent normalized phrases since startup (approximate, from the Space-Saving sketch)."""
+    if endpoint not in ("search", "autocomplete"):
+        raise HTTPException(status_code=400, detail="endpoint must be 'search' or 'autocomplete'")
+    return {"endpoint": endpoint, "phrases": query_log.top(max(1, min(k, 100)), endpoint)}
+
+# Batch search data model
+class BatchSearchItem(BaseModel):
+    q: str
+    size: int = 10
+    lang: Optional[str] = None
+
+class BatchSearchRequest(BaseModel):
+    queries: List[BatchSearchItem]
+    # Per-query search timeout; must leave room within the client timeout so
+    # partial results come back instead of the whole _msearch failing
+    timeout_ms: int = Field(5000, gt=0, lt=OPENSEARCH_TIMEOUT_SECONDS * 1000)
+
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", "50"))
+MAX_BATCH_RESULT_SIZE = 50
+
+@app.post("/search/batch")
+@profiled
+def search_batch(batch: BatchSearchRequest):
+    """
+    Run many phrase searches through one _msearch call, then fetch context for
+    every hit with a second one. Results are a list in request order; repeated
+    queries (same phrase, size and language) are searched once. Sub-queries
+    that hit the per-query timeout return whatever partial hits they collected.
+    """
+    if not any(item.q.strip() for item in batch.queries):
+        raise HTTPException(status_code=400, detail="At least one non-empty query is required")
+    if len(batch.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+
+    # Distinct (phrase, size, language) searches, in first-seen order, with
+    # the index and language filters each one runs against
+    searches = {}
+    for item in batch.queries:
+        if item.q.strip():
+            key = (item.q, max(1, min(item.size, MAX_BATCH_RESULT_SIZE)), primary_language(item.lang))
+            if key not in searches:
+                searches[key] = search_index(item.lang)
+
+    def do_batch():
+        msearch_body = []
+        for (q, size, _), (index, language_filters) in searches.items():
+            body = build_search_body(q, size, language_filters)
+            body["timeout"] = f"{batch.timeout_ms}ms"
+            msearch_body.extend([{"index": index}, body])
+        resp = client.msearch(body=msearch_body)
+
+        entries = {}
+        all_results = []
+        result_indices = []
+        for key, sub_resp in zip(searches, resp.get("responses", [])):
+            q, size, _ = key
+            index, _ = searches[key]
+            if "error" in sub_resp:
+                error = sub_resp["error"]
+                reason = error.get("reason", str(error)) if isinstance(error, dict) else str(error)
+                entries[key] = {"query": q, "count": 0, "results": [], "error": reason}
+                continue
+            results = collect_results(sub_resp.get("hits", {}).get("hits", []), size)
+            all_results.extend(results)
+            # Look context up in the index each phrase searched, not the global alias
+            result_indices.extend([index] * len(results))
+            entries[key] = {
+                "query": q,
+                "count": len(results),
+                "results": results,
+                "timed_out": bool(sub_resp.get("timed_out")),
+            }
+        attach_previous_segments(all_results, indices=result_indices)
+        return entries
+
+    try:
+        entries = cluster_call(do_batch, timeout=15)
+    except Exception as e:
+        return {"count": 0, "results": [], "error": str(e)}
+
+    results = []
+    for item in batch.queries:
+        if not item.q.strip():
+            results.append({"query": item.q, "lang": item.lang, "count": 0, "results": [], "error": "Empty query"})
+            continue
+        key = (item.q, max(1, min(item.size, MAX_BATCH_RESULT_SIZE)), primary_language(item.lang))
+        entry = entries.get(key, {"query": item.q, "count": 0, "results": [], "error": "No response"})
+        results.append({**entry, "lang": item.lang})
+    return {"count": len(results), "results": results}
+
+def match_excerpt(text: str, q: str, max_words: int = 10):
+    """
+    Up to max_words of text starting where q matches (whole words, the last
+    one as a prefix), with "..." marking cut text. Segments span whole
+    sentences, so the match is often far from the start. Falls back to the
+    first words when q only matched after stemming.
+    """
+    words = text.split()
+    if len(words) <= max_words:
+        return text
+
+    def normalize(word):
+        return re.sub(r"[^\w']", "", word.lower())
+
+    normalized = [normalize(word) for word in words]
+    query_words = [normalize(word) for word in q.split()]
+    query_words = [word for word in query_words if word]
+    start = 0
+    if query_words:
+        n = len(query_words)
+        for i in range(len(words) - n + 1):
+            if normalized[i:i + n - 1] == query_words[:-1] and normalized[i + n - 1].startswith(query_words[-1]):
+                # Keep the match whole, ending at the last word if it runs that far
+                start = max(0, min(i, len(words) - max_words))
+                break
+    excerpt = " ".join(words[start:start + max_words])
+    return ("..." if start > 0 else "") + excerpt + ("..." if start + max_words < len(words) else "")
+
+def run_autocomplete(q: str, size: int = 5, include_clip: bool = False):
+    """
+    Suggest transcript lines starting with q. With include_clip, each
+    suggestion also carries its segment's ID and a playable clip (full text,
+    timing and previous context), so picking one needs no further request.
+    """
     def do_autocomplete():
         # Use match_phrase_prefix for fast prefix matching
         body = {
@@ -125,39 +714,104 @@ def autocomplete(q: str, size: int = 5):
                 }
             },
             "size": size * 2,  # Get more results to deduplicate
-            "_source": ["text", "video_id", "start_time", "end_time"],  # Include timing info
+            # Include timing info, plus the context a clip needs
+            "_source": RESULT_SOURCE if include_clip else ["text", "video_id", "start_time", "end_time"],
             "timeout": "500ms"  # Fast timeout for autocomplete
         }
-        return client.search(index="youtube-transcripts", body=body)
-
-    try:
-        resp = executor.submit(do_autocomplete).result(timeout=2)
+        resp = client.search(index=INDEX_NAME, body=body)
         suggestions = []
         seen_texts = set()
         
         for hit in resp["hits"]["hits"]:
             text = hit["_source"].get("text", "").strip()
             if text and text not in seen_texts and len(suggestions) < size:
-                # Extract the relevant phrase around the match
-                words = text.split()
-                if len(words) > 10:  # Truncate long texts
-                    text = " ".join(words[:10]) + "..."
+                # Show the words around the match, not the start of the window
+                text = match_excerpt(text, q)
                 
-                suggestions.append({
+                suggestion = {
                     "text": text,
                     "video_id": hit["_source"].get("video_id"),
                     "start_time": hit["_source"].get("start_time"),
                     "end_time": hit["_source"].get("end_time"),
                     "score": hit.get("_score")
-                })
+                }
+                if include_clip:
+                    suggestion.update(segment_id=hit["_id"], index=hit["_index"], clip=hit_to_result(hit))
+                suggestions.append(suggestion)
                 seen_texts.add(text)
-        
+
+        if include_clip:
+            # Only documents indexed before context was stored need a lookup
+            attach_previous_segments([suggestion["clip"] for suggestion in suggestions])
+        return suggestions
+
+    try:
+        suggestions = cluster_call(do_autocomplete, timeout=2)
         return {"query": q, "suggestions": suggestions}
     except Exception as e:
         return {"query": q, "suggestions": [], "error": str(e)}
 
-@app.get("/video-search")
-def video_search(video_id: str, q: str = "", size: int = 25, single_result: bool = False):
+@app.get("/autocomplete")
+@profiled
+def autocomplete(request: Request, q: str, size: int = 5, include_clip: bool = False):
+    if len(q.strip()) < 2:  # Don't suggest for very short queries
+        return {"query": q, "suggestions": []}
+
+    started = time.perf_counter()
+    key = f"autocomplete|{normalize_query(q)}|{size}|{include_clip}"
+    payload, cache_status = serve_resilient(key, lambda: run_autocomplete(q, size, include_clip))
+    query_log.emit(
+        "autocomplete", q,
+        size=size,
+        hits=len(payload["suggestions"]),
+        latency_ms=round((time.perf_counter() - started) * 1000, 2),
+        cache=cache_status,
+        error=bool(payload.get("error")),
+    )
+    return cacheable_response(request, payload, AUTOCOMPLETE_CACHE_MAX_AGE, {"X-Cache": cache_status})
+
+def run_segment_lookup(segment_id: str, index: Optional[str] = None):
+    """
+    Fetch one segment by document ID. A GET needs the concrete index (returned
+    with autocomplete clips); without it, or for INDEX_NAME, which may be the
+    multi-index read alias, an ids query covers the read alias.
+    """
+    def do_lookup():
+        if index and index != INDEX_NAME:
+            resp = client.get(index=index, id=segment_id, _source=RESULT_SOURCE, ignore=404)
+            hit = resp if resp.get("found") else None
+        else:
+            resp = client.search(index=INDEX_NAME, body={
+                "query": {"ids": {"values": [segment_id]}},
+                "size": 1,
+                "_source": RESULT_SOURCE,
+            })
+            hits = resp["hits"]["hits"]
+            hit = hits[0] if hits else None
+        if hit is None:
+            return None
+        return attach_previous_segments([hit_to_result(hit)], index or INDEX_NAME)[0]
+
+    try:
+        result = cluster_call(do_lookup, timeout=5)
+        return {"segment_id": segment_id, "result": result}
+    except Exception as e:
+        return {"segment_id": segment_id, "result": None, "error": str(e)}
+
+@app.get("/segment")
+@profiled
+def segment(request: Request, id: str, index: Optional[str] = None):
+    # Only transcript indices may be addressed directly: the language indices
+    # behind the read alias, or the legacy unversioned index of the same name
+    if index and not re.fullmatch(re.escape(INDEX_NAME) + r"(-[a-z0-9-]+)?", index):
+        raise HTTPException(status_code=400, detail="Invalid index")
+    key = f"segment|{index or ''}|{id}"
+    payload, cache_status = serve_resilient(key, lambda: run_segment_lookup(id, index))
+    if payload["result"] is None and not payload.get("error"):
+        raise HTTPException(status_code=404, detail="Segment not found")
+    return cacheable_response(request, payload, SEARCH_CACHE_MAX_AGE, {"X-Cache": cache_status})
+
+def run_video_search(video_id: str, q: str = "", size: int = 25, single_result: bool = False):
     def do_video_search():
         # Build query for specific video
         if q.strip():
@@ -171,53 +825,54 @@ def video_search(video_id: str, q: str = "", size: int = 25, single_result: bool
                         ]
                     }
                 },
-                "size": 1 if single_result else size
+                "size": 1 if single_result else size,
+                "_source": RESULT_SOURCE
             }
         else:
             # Get all segments from the video
             body = {
                 "query": {"term": {"video_id": video_id}},
                 "size": 1 if single_result else size,
-                "sort": [{"start_time": {"order": "asc"}}]
+                "sort": [{"start_time": {"order": "asc"}}],
+                "_source": RESULT_SOURCE
             }
         
-        return client.search(index="youtube-transcripts", body=body)
-
-    try:
-        resp = executor.submit(do_video_search).result(timeout=10)
+        resp = client.search(index=INDEX_NAME, body=body)
         results = []
         
         for hit in resp["hits"]["hits"]:
             src = hit["_source"]
             
-            # Find previous segment for context
-            prev_body = {
-                "query": {
-                    "bool": {
-                        "must": [
-                            {"term": {"video_id": src.get("video_id")}},
-                            {"range": {"end_time": {"lt": src.get("start_time", 0)}}}
-                        ]
-                    }
-                },
-                "sort": [{"end_time": {"order": "desc"}}],
-                "size": 1
-            }
-            
-            try:
-                prev_resp = client.search(index="youtube-transcripts", body=prev_body)
-                previous = None
-                if prev_resp["hits"]["hits"]:
-                    prev_src = prev_resp["hits"]["hits"][0]["_source"]
-                    previous = {
-                        "start_time": prev_src.get("start_time"),
-                        "end_time": prev_src.get("end_time"),
-                        "text": prev_src.get("text"),
-                        "language_code": prev_src.get("language_code")
-                    }
-            except:
-                previous = None
-            
+            previous = stored_previous(src)
+            if previous is None and "previous" not in src:
+                # Older documents carry no stored context; find the previous segment
+                prev_body = {
+                    "query": {
+                        "bool": {
+                            "must": [
+                                {"term": {"video_id": src.get("video_id")}},
+                                {"range": {"end_time": {"lt": src.get("start_time", 0)}}}
+                            ]
+                        }
+                    },
+                    "sort": [{"end_time": {"order": "desc"}}],
+                    "size": 1,
+                    "_source": CONTEXT_SOURCE
+                }
+
+                try:
+                    prev_resp = client.search(index=INDEX_NAME, body=prev_body)
+                    if prev_resp["hits"]["hits"]:
+                        prev_src = prev_resp["hits"]["hits"][0]["_source"]
+                        previous = {
+                            "start_time": prev_src.get("start_time"),
+                            "end_time": prev_src.get("end_time"),
+                            "text": prev_src.get("text"),
+                            "language_code": prev_src.get("language_code")
+                        }
+                except:
+                    previous = None
+
             results.append({
                 "video_id": src.get("video_id"),
                 "language_code": src.get("language_code"),
@@ -227,11 +882,21 @@ def video_search(video_id: str, q: str = "", size: int = 25, single_result: bool
                 "score": hit.get("_score"),
                 "previous": previous
             })
-        
+        return results
+
+    try:
+        results = cluster_call(do_video_search, timeout=10)
         return {"video_id": video_id, "query": q, "results": results}
     except Exception as e:
         return {"video_id": video_id, "query": q, "results": [], "error": str(e)}
 
+@app.get("/video-search")
+@profiled
+def video_search(request: Request, video_id: str, q: str = "", size: int = 25, single_result: bool = False):
+    key = f"video-search|{video_id}|{normalize_query(q)}|{size}|{single_result}"
+    payload, cache_status = serve_resilient(key, lambda: run_video_search(video_id, q, size, single_result))
+    return cacheable_response(request, payload, SEARCH_CACHE_MAX_AGE, {"X-Cache": cache_status})
+
 # Waitlist data model
 class WaitlistEntry(BaseModel):
     email: str
@@ -0,0 +1,95 @@
+import os
+import argparse
+import orjson
+from datetime import datetime
+from pathlib import Path
+from main import PRECOMPUTED_FILE, run_search, precompute_key
+from query_log import normalize_query, read_top_phrases
+
+POPULAR_PHRASES_FILE = Path(os.getenv("POPULAR_PHRASES_FILE", "data/popular_phrases.txt"))
+QUERY_LOG_DIR = Path(os.getenv("QUERY_LOG_DIR", "data/query_logs"))
+
+
+def read_popular_phrases(file_path=POPULAR_PHRASES_FILE, top_n=100):
+    """Read phrases (one per line, most popular first), skipping comments and duplicates."""
+    phrases = []
+    seen = set()
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                phrase = normalize_query(line)
+                if phrase and not phrase.startswith("#") and phrase not in seen:
+                    seen.add(phrase)
+                    phrases.append(phrase)
+    except FileNotFoundError:
+        print(f"Warning: {file_path} not found.")
+    return phrases[:top_n]
+
+
+def precompute(phrases, sizes=(25,), langs=(None,)):
+    results = {}
+    failed = 0
+    for phrase in phrases:
+        for size in sizes:
+            for lang in langs:
+                payload = run_search(phrase, size, lang)
+                if payload.get("error"):
+                    print(f"✗ {phrase!r} (size={size}, lang={lang}): {payload['error']}")
+                    failed += 1
+                    continue
+                results[precompute_key(phrase, size, lang)] = payload
+    return results, failed
+
+
+def write_precomputed(results, phrases, output_file=PRECOMPUTED_FILE):
+    """Write atomically so a running backend never reads a half-written file."""
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = output_file.with_suffix(output_file.suffix + ".tmp")
+    with open(tmp_file, "wb") as f:
+        f.write(orjson.dumps({
+            "generated_at": datetime.now().isoformat(),
+            "phrases": phrases,
+            "results": results,
+        }))
+    os.replace(tmp_file, output_file)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Precompute /search responses for the most popular phrases",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Run after each ingestion run so the backend serves head queries without cluster work.
+
+Examples:
+  python precompute.py                          # Top 100 phrases from data/popular_phrases.txt
+  python precompute.py --top-n 500 --sizes 10 25
+  python precompute.py --langs en es            # Also precompute language-scoped searches
+  python precompute.py --from-query-logs        # Use the most searched phrases from the query logs
+        """
+    )
+    parser.add_argument("--phrases-file", default=str(POPULAR_PHRASES_FILE), help="Phrases, one per line, most popular first")
+    parser.add_argument("--from-query-logs", action="store_true", help="Take phrases from the backend query logs instead")
+    parser.add_argument("--log-files", type=int, default=24 * 7, help="Number of most recent hourly query log files to read")
+    parser.add_argument("--top-n", type=int, default=100, help="Number of phrases to precompute")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[25], help="Result sizes to precompute")
+    parser.add_argument("--langs", nargs="+", default=[], help="Language codes to precompute in addition to all-language search")
+    parser.add_argument("--output", default=str(PRECOMPUTED_FILE), help="Output file read by the backend")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    if args.from_query_logs:
+        phrases = read_top_phrases(QUERY_LOG_DIR, args.top_n, max_files=args.log_files)
+    else:
+        phrases = read_popular_phrases(args.phrases_file, args.top_n)
+    if not phrases:
+        print("No phrases to precompute")
+        exit(1)
+
+    print(f"Precomputing {len(phrases)} phrases...")
+    results, failed = precompute(phrases, args.sizes, [None] + args.langs)
+    write_precomputed(results, phrases, Path(args.output))
+    print(f"Wrote {len(results)} responses to {args.output} ({failed} failed)")
@@ -0,0 +1,342 @@
+import asyncio
+import contextvars
+import functools
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import orjson
+
+# Opt-in request profiling. A request is profiled when it carries
+# PROFILE_HEADER with PROFILE_ADMIN_TOKEN (the breakdown is returned in the
+# response under "debug"), or when it is picked at PROFILE_SAMPLE_RATE (the
+# breakdown is written to PROFILE_DIR). Nothing is sampled otherwise.
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Debug-Profile").lower().encode("latin-1")
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "data/profiles"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+MAX_STACK_DEPTH = 40
+
+current_profile = contextvars.ContextVar("current_profile", default=None)
+
+
+class RequestProfile:
+    """Stack samples and OpenSearch calls collected for one request."""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.started_at = datetime.now().isoformat()
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.threads = Counter()  # thread id -> nesting depth of tracked calls
+        self.samples = Counter()  # collapsed stack -> sample count
+        self.queries = []
+
+    def enter_thread(self):
+        with self.lock:
+            self.threads[threading.get_ident()] += 1
+
+    def exit_thread(self):
+        ident = threading.get_ident()
+        with self.lock:
+            self.threads[ident] -= 1
+            if self.threads[ident] <= 0:
+                del self.threads[ident]
+
+    def add_query(self, record):
+        with self.lock:
+            self.queries.append(record)
+
+    def report(self):
+        total_ms = (time.perf_counter() - self.started) * 1000
+        with self.lock:
+            samples = Counter(self.samples)
+            queries = list(self.queries)
+        cluster_ms = sum(query["wall_ms"] for query in queries)
+
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in samples.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+
+        return {
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "total_ms": round(total_ms, 2),
+            "opensearch": {
+                "calls": len(queries),
+                "wall_ms": round(cluster_ms, 2),
+                "took_ms": sum(query.get("took_ms") or 0 for query in queries),
+                "queries": queries,
+            },
+            # Time outside OpenSearch round trips: parsing, result assembly, serialization
+            "python_ms": round(max(total_ms - cluster_ms, 0.0), 2),
+            "samples": {
+                "interval_ms": PROFILE_INTERVAL_MS,
+                "count": sum(samples.values()),
+                "top_self": [{"frame": frame, "samples": count} for frame, count in own.most_common(15)],
+                "top_inclusive": [{"frame": frame, "samples": count} for frame, count in inclusive.most_common(15)],
+                # Collapsed stacks, ready for flamegraph tools
+                "stacks": [{"stack": stack, "samples": count} for stack, count in samples.most_common(50)],
+            },
+        }
+
+
+class Sampler:
+    """
+    One daemon thread that snapshots the stacks of tracked threads every
+    interval while at least one profile is active, and sleeps otherwise.
+    """
+
+    def __init__(self, interval_seconds):
+        self.interval_seconds = interval_seconds
+        self.active = set()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.thread = None
+
+    def start(self, profile):
+        with self.lock:
+            self.active.add(profile)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="request-sampler", daemon=True)
+                self.thread.start()
+            self.wakeup.notify()
+
+    def stop(self, profile):
+        with self.lock:
+            self.active.discard(profile)
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while not self.active:
+                    self.wakeup.wait()
+                profiles = list(self.active)
+            frames = sys._current_frames()
+            for profile in profiles:
+                with profile.lock:
+                    idents = list(profile.threads)
+                for ident in idents:
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        stack = collapse_stack(frame)
+                        with profile.lock:
+                            profile.samples[stack] += 1
+            time.sleep(self.interval_seconds)
+
+
+def collapse_stack(frame):
+    frames = []
+    while frame is not None and len(frames) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        frames.append(f"{Path(code.co_filename).name}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+sampler = Sampler(PROFILE_INTERVAL_MS / 1000)
+
+
+def profiled(fn):
+    """Sample the decorated endpoint's thread while its request is being profiled."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        profile.enter_thread()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.exit_thread()
+    return wrapper
+
+
+def propagate(fn):
+    """
+    Wrap fn for another thread (e.g. an executor) so it sees the submitting
+    request's profile and its stack is sampled too.
+    """
+    return functools.partial(contextvars.copy_context().run, profiled(fn))
+
+
+def summarize_query_profile(profile_section):
+    """Per shard: query tree with timings, rewrite and collector time, from OpenSearch's "profile" output."""
+    def node(entry, depth=0):
+        summary = {
+            "type": entry.get("type"),
+            "description": (entry.get("description") or "")[:200],
+            "time_ms": round(entry.get("time_in_nanos", 0) / 1e6, 3),
+        }
+        breakdown = entry.get("breakdown") or {}
+        slowest = sorted(
+            ((name, nanos) for name, nanos in breakdown.items() if not name.endswith("_count") and nanos),
+            key=lambda item: item[1], reverse=True,
+        )[:3]
+        if slowest:
+            summary["slowest_phases"] = {name: round(nanos / 1e6, 3) for name, nanos in slowest}
+        if entry.get("children") and depth < 3:
+            summary["children"] = [node(child, depth + 1) for child in entry["children"]]
+        return summary
+
+    shards = []
+    for shard in (profile_section or {}).get("shards", []):
+        for search in shard.get("searches", []):
+            shards.append({
+                "shard": shard.get("id"),
+                "rewrite_ms": round(search.get("rewrite_time", 0) / 1e6, 3),
+                "collector_ms": round(sum(c.get("time_in_nanos", 0) for c in search.get("collector", [])) / 1e6, 3),
+                "query": [node(entry) for entry in search.get("query", [])],
+            })
+    return shards
+
+
+def _with_profile_flag(url, body):
+    if url.endswith("/_search") and isinstance(body, dict):
+        return {**body, "profile": True}
+    if url.endswith("/_msearch") and isinstance(body, (str, bytes)):
+        text = body.decode("utf-8") if isinstance(body, bytes) else body
+        lines = [line for line in text.split("\n") if line]
+        # Header and body lines alternate; flag every body
+        for i in range(1, len(lines), 2):
+            lines[i] = orjson.dumps({**orjson.loads(lines[i]), "profile": True}).decode("utf-8")
+        return "\n".join(lines) + "\n"
+    return body
+
+
+def _record_response(profile, method, url, response, wall_ms):
+    record = {"method": method, "path": url.split("?")[0], "wall_ms": round(wall_ms, 2)}
+    if isinstance(response, dict):
+        if "responses" in response:
+            record["took_ms"] = response.get("took")
+            record["searches"] = []
+            for sub_response in response["responses"]:
+                record["searches"].append({
+                    "took_ms": sub_response.get("took"),
+                    "hits": len(sub_response.get("hits", {}).get("hits", [])),
+                    "shards": summarize_query_profile(sub_response.pop("profile", None)),
+                })
+        else:
+            record["took_ms"] = response.get("took")
+            if "profile" in response:
+                record["shards"] = summarize_query_profile(response.pop("profile"))
+    profile.add_query(record)
+
+
+def install_query_profiling(client):
+    """
+    Wrap the client's transport so searches made while a request is profiled
+    run with "profile": true. The timing breakdown is recorded on the profile
+    and removed from the response, so callers see the usual shape.
+    """
+    perform_request = client.transport.perform_request
+
+    def profiling_perform_request(method, url, headers=None, params=None, body=None):
+        profile = current_profile.get()
+        if profile is None:
+            return perform_request(method, url, headers=headers, params=params, body=body)
+        body = _with_profile_flag(url, body)
+        started = time.perf_counter()
+        response = perform_request(method, url, headers=headers, params=params, body=body)
+        _record_response(profile, method, url, response, (time.perf_counter() - started) * 1000)
+        return response
+
+    client.transport.perform_request = profiling_perform_request
+
+
+def write_profile(report, profile_dir=PROFILE_DIR):
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    slug = report["path"].strip("/").replace("/", "-") or "root"
+    path = profile_dir / f"{datetime.now():%Y%m%d-%H%M%S-%f}-{slug}.json"
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+    return path
+
+
+class ProfilingMiddleware:
+    """
+    Decide per request whether to profile it. Admin-requested profiles are
+    attached to the JSON response under "debug" and marked no-store; sampled
+    profiles are written to PROFILE_DIR and the response is left untouched.
+    """
+
+    def __init__(self, app, admin_token=PROFILE_ADMIN_TOKEN, sample_rate=PROFILE_SAMPLE_RATE, profile_dir=PROFILE_DIR):
+        self.app = app
+        # Compared against the raw header bytes: compare_digest() only accepts
+        # ASCII str, and headers may carry any byte
+        self.admin_token = admin_token.encode("utf-8")
+        self.sample_rate = sample_rate
+        self.profile_dir = profile_dir
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = dict(scope.get("headers", [])).get(PROFILE_HEADER, b"")
+        inline = bool(self.admin_token) and hmac.compare_digest(token, self.admin_token)
+        if not inline and not (self.sample_rate > 0 and random.random() < self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope.get("method"), scope.get("path"))
+        context_token = current_profile.set(profile)
+        sampler.start(profile)
+        start_message = None
+        body_parts = []
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if not inline:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            sampler.stop(profile)
+            body = b"".join(body_parts)
+            headers = list(start_message.get("headers", []))
+            content_type = dict(headers).get(b"content-type", b"")
+            if content_type.startswith(b"application/json") and body:
+                try:
+                    payload = orjson.loads(body)
+                except orjson.JSONDecodeError:
+                    payload = None
+                if isinstance(payload, dict):
+                    payload["debug"] = profile.report()
+                    body = orjson.dumps(payload)
+                    headers = [(k, v) for k, v in headers
+                               if k.lower() not in (b"content-length", b"etag", b"cache-control")]
+                    headers.append((b"content-length", str(len(body)).encode("latin-1")))
+                    headers.append((b"cache-control", b"no-store"))
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop(profile)
+            current_profile.reset(context_token)
+            if not inline:
+                # Off the event loop; the response has already been sent
+                await asyncio.get_running_loop().run_in_executor(None, write_profile, profile.report(), self.profile_dir)
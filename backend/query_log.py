@@ -0,0 +1,143 @@
+import gzip
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+
+def normalize_query(q):
+    """Lowercase, collapse whitespace and trim surrounding punctuation."""
+    return " ".join(q.lower().split()).strip(" .,!?;:\"'()[]")
+
+
+class SpaceSaving:
+    """
+    Bounded-memory top-K heavy hitter tracking (Space-Saving algorithm).
+    Holds at most `capacity` counters; an unseen item replaces the smallest
+    counter and inherits its count as the error bound, so any item whose true
+    frequency exceeds total/capacity is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counters = {}  # item -> [count, error]
+        self.total = 0
+
+    def add(self, item, weight=1):
+        self.total += weight
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[item] = [weight, 0]
+            return
+        victim = min(self.counters, key=lambda k: self.counters[k][0])
+        min_count = self.counters.pop(victim)[0]
+        self.counters[item] = [min_count + weight, min_count]
+
+    def top(self, k=10):
+        ranked = sorted(self.counters.items(), key=lambda kv: kv[1][0], reverse=True)[:k]
+        return [{"phrase": item, "count": count, "error": error} for item, (count, error) in ranked]
+
+
+class QueryLog:
+    """
+    Non-blocking query event log. emit() only appends to an in-memory ring
+    buffer; a background thread drains it in batches, updates the per-endpoint
+    heavy-hitter sketches and appends the events to hourly gzip-compressed
+    JSONL files, rotating early when a file exceeds rotate_bytes.
+    """
+
+    def __init__(self, log_dir="data/query_logs", buffer_size=10000, flush_interval=5.0,
+                 rotate_bytes=50 * 1024 * 1024, sketch_capacity=1000):
+        self.log_dir = Path(log_dir)
+        self.buffer = deque(maxlen=buffer_size)
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.sketch_capacity = sketch_capacity
+        self.sketches = {}
+        self.sketch_lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def emit(self, endpoint, query, **fields):
+        # deque.append is thread-safe and O(1); when full the oldest event is dropped
+        self.buffer.append({"ts": time.time(), "endpoint": endpoint, "phrase": normalize_query(query), **fields})
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def _run(self):
+        while not self.stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing query log: {e}")
+
+    def flush(self):
+        with self.flush_lock:
+            batch = []
+            while self.buffer:
+                try:
+                    batch.append(self.buffer.popleft())
+                except IndexError:
+                    break
+            if not batch:
+                return 0
+
+            with self.sketch_lock:
+                for event in batch:
+                    if event["phrase"]:
+                        sketch = self.sketches.setdefault(event["endpoint"], SpaceSaving(self.sketch_capacity))
+                        sketch.add(event["phrase"])
+
+            lines = "".join(json.dumps(event, ensure_ascii=False) + "\n" for event in batch)
+            # Each flush appends a gzip member; concatenated members form a valid gzip file
+            with gzip.open(self._current_file(), "ab") as f:
+                f.write(lines.encode("utf-8"))
+            return len(batch)
+
+    def _current_file(self):
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"queries-{datetime.now().strftime('%Y%m%d-%H')}"
+        part = 0
+        path = self.log_dir / f"{stem}.jsonl.gz"
+        while path.exists() and path.stat().st_size >= self.rotate_bytes:
+            part += 1
+            path = self.log_dir / f"{stem}-{part}.jsonl.gz"
+        return path
+
+    def top(self, k=10, endpoint="search"):
+        with self.sketch_lock:
+            sketch = self.sketches.get(endpoint)
+            return sketch.top(k) if sketch else []
+
+
+def read_top_phrases(log_dir="data/query_logs", top_n=100, endpoint="search", max_files=None):
+    """Stream logged events (newest files first) through a Space-Saving sketch and return the top phrases."""
+    files = sorted(Path(log_dir).glob("queries-*.jsonl.gz"), reverse=True)
+    if max_files:
+        files = files[:max_files]
+    sketch = SpaceSaving(capacity=max(top_n * 10, 1000))
+    for path in files:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    event = json.loads(line)
+                    if event.get("endpoint") == endpoint and event.get("phrase") and not event.get("error"):
+                        sketch.add(event["phrase"])
+        except (OSError, EOFError, ValueError) as e:
+            print(f"Warning: skipping unreadable query log {path}: {e}")
+    return [entry["phrase"] for entry in sketch.top(top_n)]
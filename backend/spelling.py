@@ -0,0 +1,138 @@
+import gzip
+import re
+from datetime import datetime
+from itertools import combinations
+
+import orjson
+
+# Letters with internal apostrophes ("don't", "l'eau"); digits are never corrected
+WORD_RE = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
+
+
+def tokenize(text):
+    return WORD_RE.findall((text or "").lower())
+
+
+def damerau_levenshtein(a, b, max_distance):
+    """
+    Optimal string alignment distance between a and b, or -1 once it is
+    certain to exceed max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return -1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return -1
+        previous_previous, previous = previous, current
+    return previous[-1] if previous[-1] <= max_distance else -1
+
+
+class SymSpell:
+    """
+    Spelling correction by symmetric deletion. Every dictionary word's prefix
+    is expanded into all strings reachable by up to max_edit_distance
+    deletions, once, at build time. A lookup only generates the deletions of
+    the input and checks the words that share one, so no edit candidates are
+    ever generated against the whole vocabulary.
+    """
+
+    def __init__(self, words, max_edit_distance=2, prefix_length=7):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.words = words  # word -> corpus frequency
+        # Most deletion keys belong to a single word, which is stored as is;
+        # only shared keys get a list
+        self.deletes = {}
+        for word in words:
+            for key in self._deletions(word[:prefix_length]):
+                entry = self.deletes.get(key)
+                if entry is None:
+                    self.deletes[key] = word
+                elif isinstance(entry, str):
+                    self.deletes[key] = [entry, word]
+                else:
+                    entry.append(word)
+
+    def _deletions(self, word):
+        keys = {word}
+        for distance in range(1, min(self.max_edit_distance, len(word) - 1) + 1):
+            for positions in combinations(range(len(word)), distance):
+                keys.add("".join(c for i, c in enumerate(word) if i not in positions))
+        return keys
+
+    def lookup(self, word):
+        """Return the closest, then most frequent, dictionary word within max_edit_distance, or None."""
+        if word in self.words:
+            return word
+        best = None
+        best_key = (self.max_edit_distance + 1, 0)
+        checked = set()
+        for key in self._deletions(word[:self.prefix_length]):
+            entry = self.deletes.get(key, ())
+            for candidate in (entry,) if isinstance(entry, str) else entry:
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                distance = damerau_levenshtein(word, candidate, best_key[0])
+                if distance < 0:
+                    continue
+                rank = (distance, -self.words[candidate])
+                if rank < best_key:
+                    best, best_key = candidate, rank
+        return best
+
+    def correct(self, query):
+        """
+        Return the query with unknown words replaced by their best correction,
+        or None when every word is known or nothing close enough exists.
+        """
+        changed = False
+
+        def replace(match):
+            nonlocal changed
+            word = match.group(0)
+            if word in self.words or len(word) < 3:
+                return word
+            correction = self.lookup(word)
+            if correction is None:
+                return word
+            changed = True
+            return correction
+
+        corrected = WORD_RE.sub(replace, (query or "").lower())
+        return corrected if changed else None
+
+    def __len__(self):
+        return len(self.words)
+
+
+def write_vocabulary(path, counts, source_index, min_count=2, max_words=30000):
+    """Write the max_words most frequent words seen at least min_count times as gzip JSON."""
+    words = dict(
+        (word, count) for word, count in counts.most_common(max_words) if count >= min_count
+    )
+    payload = {
+        "generated_at": datetime.now().isoformat(),
+        "source_index": source_index,
+        "words": words,
+    }
+    with gzip.open(path, "wb") as f:
+        f.write(orjson.dumps(payload))
+    return len(words)
+
+
+def load_vocabulary(path, max_words=None):
+    """Read a vocabulary file, keeping at most max_words of its most frequent words."""
+    with gzip.open(path, "rb") as f:
+        words = orjson.loads(f.read())["words"]
+    if max_words is not None and len(words) > max_words:
+        words = dict(sorted(words.items(), key=lambda item: item[1], reverse=True)[:max_words])
+    return words
@@ -26,8 +26,14 @@ type AutocompleteSuggestion = {
   video_id: string;
   start_time?: number;
   end_time?: number;
+  segment_id?: string;
+  index?: string;
+  clip?: TranscriptHit;
 };
 
+// Longest clip, in seconds, that still gets the previous segment as a lead-in
+const MAX_CLIP_SECONDS = 15;
+
 // YouTube IFrame API types
 interface YouTubePlayer {
   seekTo: (seconds: number, allowSeekAhead: boolean) => void;
@@ -115,7 +121,8 @@ export default function HomePage() {
     setIsLoadingSuggestions(true);
     try {
       const apiUrl = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
-      const url = `${apiUrl}/autocomplete?q=${encodeURIComponent(searchQuery)}&size=5`;
+      // include_clip returns each suggestion's playable segment, so selecting one needs no extra request
+      const url = `${apiUrl}/autocomplete?q=${encodeURIComponent(searchQuery)}&size=5&include_clip=true`;
 
       const res = await fetch(url);
       if (res.ok) {
@@ -184,20 +191,26 @@ export default function HomePage() {
     setResults([]); // Clear previous results immediately to show loading state
     
     try {
-      const apiUrl = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
-      // Use the fast video-specific search endpoint with single_result=true for autocomplete
-      const response = await fetch(
-        `${apiUrl}/video-search?video_id=${encodeURIComponent(suggestion.video_id)}&q=${encodeURIComponent(suggestion.text)}&single_result=true`
-      );
-      
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
+      if (suggestion.clip) {
+        // The suggestion already carries the full segment and its context
+        setResults([suggestion.clip]);
+      } else {
+        const apiUrl = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
+        // Look the segment up by ID when known; otherwise fall back to searching the video
+        const url = suggestion.segment_id
+          ? `${apiUrl}/segment?id=${encodeURIComponent(suggestion.segment_id)}${suggestion.index ? `&index=${encodeURIComponent(suggestion.index)}` : ""}`
+          : `${apiUrl}/video-search?video_id=${encodeURIComponent(suggestion.video_id)}&q=${encodeURIComponent(suggestion.text)}&single_result=true`;
+        const response = await fetch(url);
+        
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        
+        const data = await response.json();
+        
+        // Results are already filtered to the specific video
+        setResults(data.result ? [data.result] : data.results || []);
       }
-      
-      const data = await response.json();
-      
-      // Results are already filtered to the specific video
-      setResults(data.results || []);
     } catch (err) {
       setError(err instanceof Error ? err.message : "An error occurred");
       setResults([]);
@@ -500,8 +513,14 @@ export default function HomePage() {
                 // Only display the first result
                 const hit = results[0];
                 const idx = 0;
+                // Lead in with the previous segment only while the whole clip stays
+                // short; sentence windows usually carry enough context on their own
+                const includePrevious =
+                  typeof hit.previous?.start_time === "number" &&
+                  typeof hit.end_time === "number" &&
+                  hit.end_time - hit.previous.start_time <= MAX_CLIP_SECONDS;
                 const earliestStart =
-                  typeof hit.previous?.start_time === "number"
+                  includePrevious && hit.previous
                     ? hit.previous.start_time
                     : hit.start_time;
                 const startSec =
@@ -529,10 +548,11 @@ export default function HomePage() {
                   origin
                 )}`;
 
-                // Create combined phrase (previous + current)
-                const combinedPhrase = hit.previous
-                  ? `${hit.previous.text} ${hit.text}`
-                  : hit.text;
+                // Create combined phrase (previous + current), matching what plays
+                const combinedPhrase =
+                  includePrevious && hit.previous
+                    ? `${hit.previous.text} ${hit.text}`
+                    : hit.text;
 
                 return (
                   <div
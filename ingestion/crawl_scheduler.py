@@ -0,0 +1,160 @@
+import os
+import json
+import math
+import time
+import heapq
+from datetime import datetime, timezone
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Settings below are read at import time, whichever script imports this first
+load_dotenv()
+
+# YouTube Data API quota units per call
+SEARCH_LIST_COST = 100
+VIDEOS_LIST_COST = 1
+
+CRAWL_STATE_FILE = os.getenv("CRAWL_STATE_FILE", str(Path(__file__).resolve().parent / "crawl_state.json"))
+CRAWL_QUOTA_BUDGET = int(os.getenv("CRAWL_QUOTA_BUDGET", "8000"))  # The default daily quota is 10000
+CRAWL_TIME_BUDGET_MINUTES = float(os.getenv("CRAWL_TIME_BUDGET_MINUTES", "120"))
+# Channels crawled more recently than this get proportionally lower priority,
+# since they have had less time to upload new videos
+CRAWL_REVISIT_HOURS = float(os.getenv("CRAWL_REVISIT_HOURS", "72"))
+CRAWL_MIN_DEPTH = 3
+CRAWL_DEFAULT_DEPTH = 10
+CRAWL_MAX_DEPTH = 30
+CRAWL_MAX_PAGES = 3
+
+# Prior for channels with little history: assume one new transcript per
+# search page's worth of budget until observations say otherwise
+PRIOR_WEIGHT = 2.0
+PRIOR_HIT_RATE = 0.5
+EXPLORATION = 0.5
+
+
+class CrawlScheduler:
+    """
+    Decides which channels to crawl next, and how deep, under a quota and time
+    budget. Each crawl's cost is the share of both budgets it used; a
+    channel's priority is the new transcripts it has produced per unit of that
+    cost, plus an exploration bonus for rarely crawled channels, scaled down
+    for channels crawled recently. Statistics persist across runs.
+    """
+
+    def __init__(self, state_file=CRAWL_STATE_FILE, quota_budget=CRAWL_QUOTA_BUDGET,
+                 time_budget_seconds=CRAWL_TIME_BUDGET_MINUTES * 60):
+        # Both budgets divide every crawl's cost
+        if quota_budget <= 0 or time_budget_seconds <= 0:
+            raise ValueError("Crawl quota and time budgets must be positive")
+        self.state_file = Path(state_file)
+        self.quota_budget = quota_budget
+        self.time_budget_seconds = time_budget_seconds
+        self.quota_spent = 0
+        self.started = time.monotonic()
+        self.channels = {}
+        try:
+            with self.state_file.open("r", encoding="utf-8") as f:
+                self.channels = json.load(f).get("channels", {})
+            print(f"Loaded crawl history for {len(self.channels)} channels")
+        except FileNotFoundError:
+            pass
+
+    def save(self):
+        tmp_file = self.state_file.with_suffix(self.state_file.suffix + ".tmp")
+        with tmp_file.open("w", encoding="utf-8") as f:
+            json.dump({"updated_at": datetime.now(timezone.utc).isoformat(), "channels": self.channels}, f, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    def _stats(self, channel_id):
+        return self.channels.setdefault(channel_id, {
+            "crawls": 0,
+            "quota_units": 0,
+            "fetch_seconds": 0.0,
+            "candidates": 0,
+            "long_form": 0,
+            "new_transcripts": 0,
+            "last_crawled": None,
+        })
+
+    def _crawl_cost(self, quota_units, fetch_seconds):
+        return quota_units / self.quota_budget + fetch_seconds / self.time_budget_seconds
+
+    def _hit_rate(self, stats):
+        """Smoothed share of examined long-form videos that became new transcripts."""
+        return (stats["new_transcripts"] + PRIOR_HIT_RATE * PRIOR_WEIGHT) / (stats["long_form"] + PRIOR_WEIGHT)
+
+    def priority(self, channel_id, total_crawls):
+        stats = self._stats(channel_id)
+        prior_cost = self._crawl_cost(SEARCH_LIST_COST + VIDEOS_LIST_COST, 60)
+        cost = self._crawl_cost(stats["quota_units"], stats["fetch_seconds"]) + prior_cost * PRIOR_WEIGHT
+        expected_yield = (stats["new_transcripts"] + PRIOR_WEIGHT) / cost
+        bonus = EXPLORATION * math.sqrt(math.log(total_crawls + 2) / (stats["crawls"] + 1)) / prior_cost
+
+        freshness = 1.0
+        if stats["last_crawled"]:
+            hours = (datetime.now(timezone.utc) - datetime.fromisoformat(stats["last_crawled"])).total_seconds() / 3600
+            freshness = min(1.0, max(hours, 0.0) / CRAWL_REVISIT_HOURS)
+        return (expected_yield + bonus) * freshness
+
+    def depth_for(self, channel_id):
+        """(max_videos, max_pages) for the next crawl: deeper for channels whose videos usually pay off."""
+        stats = self._stats(channel_id)
+        hit_rate = self._hit_rate(stats)
+        max_videos = round(CRAWL_DEFAULT_DEPTH * hit_rate / PRIOR_HIT_RATE)
+        max_videos = max(CRAWL_MIN_DEPTH, min(CRAWL_MAX_DEPTH, max_videos))
+        # Search pages cost 100 units each; follow more only where long-form videos are dense
+        long_form_rate = (stats["long_form"] + 1) / (stats["candidates"] + 2)
+        max_pages = max(1, min(CRAWL_MAX_PAGES, math.ceil(max_videos / (50 * long_form_rate))))
+        return max_videos, max_pages
+
+    def remaining(self):
+        elapsed = time.monotonic() - self.started
+        return self.quota_budget - self.quota_spent, self.time_budget_seconds - elapsed
+
+    def next_channels(self, channel_ids):
+        """
+        Yield (channel_id, max_videos, max_pages) in priority order until the
+        budget cannot cover another crawl. Call record() after each crawl.
+        """
+        total_crawls = sum(self._stats(channel_id)["crawls"] for channel_id in channel_ids)
+        queue = [(-self.priority(channel_id, total_crawls), channel_id) for channel_id in dict.fromkeys(channel_ids)]
+        heapq.heapify(queue)
+        while queue:
+            quota_left, seconds_left = self.remaining()
+            if seconds_left <= 0:
+                print("Crawl time budget exhausted")
+                return
+            _, channel_id = heapq.heappop(queue)
+            max_videos, max_pages = self.depth_for(channel_id)
+            # One search page plus its videos.list, plus one videos.list per saved transcript
+            if quota_left < SEARCH_LIST_COST + VIDEOS_LIST_COST + max_videos:
+                print(f"Crawl quota budget exhausted ({self.quota_spent} of {self.quota_budget} units used)")
+                return
+            max_pages = min(max_pages, (quota_left - max_videos) // (SEARCH_LIST_COST + VIDEOS_LIST_COST))
+            yield channel_id, max_videos, max_pages
+
+    def record(self, channel_id, quota_units, fetch_seconds, candidates, long_form, new_transcripts):
+        stats = self._stats(channel_id)
+        stats["crawls"] += 1
+        stats["quota_units"] += quota_units
+        stats["fetch_seconds"] = round(stats["fetch_seconds"] + fetch_seconds, 3)
+        stats["candidates"] += candidates
+        stats["long_form"] += long_form
+        stats["new_transcripts"] += new_transcripts
+        stats["last_crawled"] = datetime.now(timezone.utc).isoformat()
+        self.quota_spent += quota_units
+        self.save()
+
+    def summary(self, channel_ids):
+        rows = []
+        for channel_id in channel_ids:
+            stats = self._stats(channel_id)
+            minutes = stats["fetch_seconds"] / 60
+            rows.append({
+                "channel_id": channel_id,
+                "crawls": stats["crawls"],
+                "new_transcripts": stats["new_transcripts"],
+                "per_1000_units": round(1000 * stats["new_transcripts"] / stats["quota_units"], 2) if stats["quota_units"] else None,
+                "per_minute": round(stats["new_transcripts"] / minutes, 2) if minutes else None,
+            })
+        return sorted(rows, key=lambda row: row["new_transcripts"], reverse=True)
@@ -0,0 +1,290 @@
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import threading
+import tracemalloc
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from opensearchpy import helpers
+import push_transcript
+from push_transcript import (
+    EC2_OPENSEARCH_HOST,
+    EC2_OPENSEARCH_PORT,
+    EC2_OPENSEARCH_USERNAME,
+    EC2_OPENSEARCH_PASSWORD,
+    EC2_OPENSEARCH_USE_SSL,
+    EC2_OPENSEARCH_VERIFY_CERTS,
+    BULK_CHUNK_SIZE,
+    get_opensearch_client,
+    build_index_body,
+    build_documents,
+    load_transcript_payload,
+)
+from dedupe import Deduper
+
+WORDS = (
+    "the be to of and a in that have I it for not on with he as you do at this but his by from they we say her "
+    "she or an will my one all would there their what so up out if about who get which go me when make can like "
+    "time no just him know take people into year your good some could them see other than then now look only come "
+    "its over think also back after use two how our work first well way even new want because any these give day "
+    "most us really actually gonna honestly basically literally right okay yeah totally pretty kind sort thing"
+).split()
+SPONSOR_READ = "this video is sponsored by our friends who make learning a new language easy so check the link below"
+
+
+def generate_transcript(video_id, minutes, rng, boilerplate_rate=0.02):
+    """
+    Build a synthetic transcript in the save_transcript_to_file() payload shape:
+    2-4 second caption fragments of 3-9 words with Zipf-like word frequencies,
+    occasional sentence punctuation and pauses, and a repeated sponsor read.
+    """
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+    entries = []
+    t = rng.uniform(0, 2)
+    end = minutes * 60
+    while t < end:
+        if rng.random() < boilerplate_rate:
+            words = SPONSOR_READ.split()
+        else:
+            words = rng.choices(WORDS, weights=weights, k=rng.randint(3, 9))
+        text = " ".join(words)
+        if rng.random() < 0.3:
+            text += rng.choice([".", "?", "!"])
+        duration = round(rng.uniform(2.0, 4.0), 3)
+        entries.append({"text": text, "start": round(t, 3), "duration": duration})
+        t += duration + (rng.uniform(1.0, 3.0) if rng.random() < 0.1 else 0)
+    return {"video_id": video_id, "language_code": "en", "entries": entries}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Accepts the requests the indexing path makes and acknowledges every bulk item."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply({"acknowledged": True})
+
+    def do_DELETE(self):
+        self._reply({"acknowledged": True})
+
+    def do_GET(self):
+        self._reply({"version": {"distribution": "opensearch", "number": "2.11.0"}})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if "_bulk" in self.path:
+            items = body.count(b"\n") // 2
+            self._reply({"took": 0, "errors": False, "items": [{"index": {"status": 201}}] * items})
+        else:
+            self._reply({"acknowledged": True})
+
+
+def start_stand_in():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class StageTimer:
+    def __init__(self):
+        self.seconds = {}
+
+    def add(self, stage, elapsed):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + elapsed
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - started)
+        return timed
+
+
+def send_bulk(client, actions, chunk_size, timer, counters):
+    """The push path's bulk indexing, split into serialization, HTTP and server-side time."""
+    serializer = client.transport.serializer
+    for i in range(0, len(actions), chunk_size):
+        started = time.perf_counter()
+        lines = []
+        for action in actions[i:i + chunk_size]:
+            header, source = helpers.expand_action(action)
+            lines.append(serializer.dumps(header))
+            lines.append(serializer.dumps(source))
+        payload = ("\n".join(lines) + "\n").encode("utf-8")
+        timer.add("serialize", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        response = client.bulk(body=payload)
+        elapsed = time.perf_counter() - started
+        took = response.get("took", 0) / 1000
+        timer.add("cluster", took)
+        timer.add("http", max(elapsed - took, 0.0))
+        counters["bytes"] += len(payload)
+        if response.get("errors"):
+            counters["errors"] += sum(1 for item in response["items"] if list(item.values())[0].get("error"))
+
+
+def run_benchmark(client, index_name, videos, minutes, chunk_size, dedupe, seed, work_dir):
+    rng = random.Random(seed)
+    timer = StageTimer()
+    counters = {"files": 0, "entries": 0, "docs": 0, "bytes": 0, "errors": 0}
+
+    # Instrument the stages build_documents runs internally
+    push_transcript.segment_transcript = timer.wrap("segment", push_transcript.segment_transcript)
+    deduper = Deduper(db_path=str(Path(work_dir) / "dedupe.sqlite")) if dedupe else None
+    if deduper is not None:
+        deduper.is_duplicate = timer.wrap("dedupe", deduper.is_duplicate)
+        deduper.is_duplicate_sentence = timer.wrap("dedupe", deduper.is_duplicate_sentence)
+
+    started = time.perf_counter()
+    paths = []
+    for n in range(videos):
+        payload = generate_transcript(f"bench{n:07d}", minutes, rng)
+        path = Path(work_dir) / f"{payload['video_id']}.json"
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        paths.append(path)
+    generate_seconds = time.perf_counter() - started
+
+    wall_started = time.perf_counter()
+    for path in paths:
+        stage_started = time.perf_counter()
+        payload = load_transcript_payload(str(path))
+        timer.add("parse", time.perf_counter() - stage_started)
+
+        stage_started = time.perf_counter()
+        actions = list(build_documents(index_name, payload["video_id"], payload["language_code"], payload["entries"], deduper))
+        timer.add("build", time.perf_counter() - stage_started)
+
+        send_bulk(client, actions, chunk_size, timer, counters)
+        counters["files"] += 1
+        counters["entries"] += len(payload["entries"])
+        counters["docs"] += len(actions)
+    wall_seconds = time.perf_counter() - wall_started
+
+    # build includes segmentation and dedupe; report it net of them
+    timer.seconds["build"] = timer.seconds.get("build", 0.0) - timer.seconds.get("segment", 0.0) - timer.seconds.get("dedupe", 0.0)
+    if deduper is not None:
+        deduper.close()
+    return {
+        "videos": videos,
+        "minutes_per_video": minutes,
+        "generate_seconds": round(generate_seconds, 3),
+        "wall_seconds": round(wall_seconds, 3),
+        "stages": {stage: round(seconds, 3) for stage, seconds in timer.seconds.items()},
+        **counters,
+        "docs_per_second": round(counters["docs"] / wall_seconds, 1) if wall_seconds else None,
+        "bytes_per_second": round(counters["bytes"] / wall_seconds, 1) if wall_seconds else None,
+    }
+
+
+def print_report(report):
+    print("\n=== Ingestion Benchmark ===")
+    print(f"Videos: {report['videos']} x {report['minutes_per_video']} min "
+          f"({report['entries']} caption entries -> {report['docs']} documents)")
+    print(f"Wall time: {report['wall_seconds']:.2f}s (synthetic data generated in {report['generate_seconds']:.2f}s)")
+    stage_total = sum(report["stages"].values()) or 1
+    for stage in ("parse", "segment", "dedupe", "build", "serialize", "http", "cluster"):
+        if stage in report["stages"]:
+            seconds = report["stages"][stage]
+            print(f"  {stage:<10} {seconds:8.3f}s  {seconds / stage_total:6.1%}")
+    print(f"Throughput: {report['docs_per_second']} docs/s, {report['bytes_per_second'] / 1024 / 1024:.2f} MB/s of bulk payload")
+    print(f"Peak RSS: {report['peak_rss_mb']:.1f} MB" + (
+        f", peak traced Python allocations: {report['peak_traced_mb']:.1f} MB" if "peak_traced_mb" in report else ""))
+    if report["errors"]:
+        print(f"Bulk item errors: {report['errors']}")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the transcript indexing path with synthetic transcripts",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Stages: parse (JSON load), segment, dedupe, build (documents), serialize (bulk
+body), http (request overhead) and cluster (server-side "took").
+
+Examples:
+  python benchmark_ingest.py                              # 50 videos against a local stand-in node
+  python benchmark_ingest.py --videos 500 --minutes 20 --no-dedupe
+  python benchmark_ingest.py --target node --index bench-transcripts   # Real node from .env
+        """
+    )
+    parser.add_argument("--videos", type=int, default=50, help="Number of synthetic transcripts")
+    parser.add_argument("--minutes", type=float, default=15, help="Length of each synthetic video")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="Documents per bulk request")
+    parser.add_argument("--target", choices=["stand-in", "node"], default="stand-in", help="Where to send bulk requests")
+    parser.add_argument("--index", default="bench-transcripts", help="Scratch index used with --target node")
+    parser.add_argument("--keep-index", action="store_true", help="Do not delete the scratch index afterwards")
+    parser.add_argument("--no-dedupe", action="store_true", help="Skip the near-duplicate stage")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also trace Python allocations (slower)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic corpus")
+    parser.add_argument("--json-out", help="Write the report as JSON to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    server = None
+    if args.target == "stand-in":
+        server = start_stand_in()
+        client = get_opensearch_client("127.0.0.1", server.server_address[1], None, None)
+    else:
+        client = get_opensearch_client(
+            EC2_OPENSEARCH_HOST,
+            EC2_OPENSEARCH_PORT,
+            EC2_OPENSEARCH_USERNAME,
+            EC2_OPENSEARCH_PASSWORD,
+            use_ssl=EC2_OPENSEARCH_USE_SSL,
+            verify_certs=EC2_OPENSEARCH_VERIFY_CERTS,
+        )
+        if client.indices.exists(index=args.index):
+            print(f"Error: {args.index} already exists; choose another --index")
+            exit(1)
+        client.indices.create(index=args.index, body=build_index_body(language_code="en"))
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-transcripts-") as work_dir:
+            report = run_benchmark(
+                client, args.index, args.videos, args.minutes, args.chunk_size,
+                not args.no_dedupe, args.seed, work_dir,
+            )
+    finally:
+        if args.target == "node" and not args.keep_index:
+            client.indices.delete(index=args.index, ignore_unavailable=True)
+        if server is not None:
+            server.shutdown()
+
+    # ru_maxrss is reported in kilobytes on Linux
+    report["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if args.tracemalloc:
+        report["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    report["target"] = args.target
+    print_report(report)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved benchmark report to: {args.json_out}")
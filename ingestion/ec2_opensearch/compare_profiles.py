@@ -0,0 +1,218 @@
+import json
+import time
+import random
+import argparse
+from opensearchpy import helpers
+from push_transcript import (
+    EC2_OPENSEARCH_HOST,
+    EC2_OPENSEARCH_PORT,
+    EC2_OPENSEARCH_USERNAME,
+    EC2_OPENSEARCH_PASSWORD,
+    EC2_OPENSEARCH_USE_SSL,
+    EC2_OPENSEARCH_VERIFY_CERTS,
+    BULK_CHUNK_SIZE,
+    MAPPING_PROFILES,
+    get_opensearch_client,
+    build_index_body,
+    build_documents,
+)
+from reindex import iter_archive_files
+
+# The query shapes the backend sends (backend/main.py), with its _source filtering
+RESULT_SOURCE = ["video_id", "language_code", "start_time", "end_time", "text", "previous"]
+
+
+def search_body(phrase):
+    return {
+        "query": {"bool": {"must": [{"match": {"text": phrase}}], "must_not": [{"term": {"boilerplate": True}}]}},
+        "size": 75,
+        "_source": RESULT_SOURCE,
+    }
+
+
+def autocomplete_body(phrase):
+    prefix = phrase[:max(2, len(phrase) - 3)]
+    return {
+        "query": {"match_phrase_prefix": {"text": {"query": prefix, "max_expansions": 10}}},
+        "size": 10,
+        "_source": ["text", "video_id", "start_time", "end_time"],
+    }
+
+
+def video_body(video_id):
+    return {
+        "query": {"term": {"video_id": video_id}},
+        "sort": [{"start_time": {"order": "asc"}}],
+        "size": 25,
+        "_source": RESULT_SOURCE,
+    }
+
+
+def load_sample(max_files, language_code):
+    """Read up to max_files archived transcripts of one language."""
+    payloads = []
+    for json_file in iter_archive_files(include_pending=True):
+        with json_file.open("r", encoding="utf-8") as f:
+            payload = json.load(f)
+        if "entries" not in payload or "video_id" not in payload:
+            continue
+        if language_code and not (payload.get("language_code") or "").startswith(language_code):
+            continue
+        payloads.append(payload)
+        if len(payloads) >= max_files:
+            break
+    return payloads
+
+
+def sample_phrases(payloads, count, rng):
+    """Pick 2-4 word phrases that occur in the sample, so every query has hits."""
+    phrases = []
+    entries = [entry for payload in payloads for entry in payload["entries"]]
+    for _ in range(count * 20 if entries else 0):
+        if len(phrases) >= count:
+            break
+        words = rng.choice(entries).get("text", "").split()
+        if len(words) < 2:
+            continue
+        length = rng.randint(2, min(4, len(words)))
+        start = rng.randint(0, len(words) - length)
+        phrases.append(" ".join(words[start:start + length]))
+    return phrases
+
+
+def build_profile_index(client, index_name, profile, payloads, language_code):
+    body = build_index_body(1, 0, language_code=language_code, profile=profile)
+    client.indices.create(index=index_name, body=body)
+
+    def actions():
+        for payload in payloads:
+            yield from build_documents(
+                index_name, payload["video_id"], payload.get("language_code"), payload["entries"], video=payload.get("video")
+            )
+
+    success, _ = helpers.bulk(client, actions(), chunk_size=BULK_CHUNK_SIZE, refresh=False)
+    # One segment per index, so the sizes compare the mappings and not merge timing
+    client.indices.forcemerge(index=index_name, max_num_segments=1, request_timeout=600)
+    client.indices.refresh(index=index_name)
+    stats = client.indices.stats(index=index_name, metric="store,docs")["indices"][index_name]["primaries"]
+    return {"docs": success, "store_bytes": stats["store"]["size_in_bytes"]}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(client, index_name, bodies, rounds):
+    """Run every body rounds times; the first round is a warm-up and is not counted."""
+    took = []
+    wall = []
+    for round_number in range(rounds + 1):
+        for body in bodies:
+            started = time.perf_counter()
+            # request_cache would answer repeats without searching
+            resp = client.search(index=index_name, body=body, params={"request_cache": "false"})
+            if round_number:
+                wall.append((time.perf_counter() - started) * 1000)
+                took.append(resp["took"])
+    return {
+        "queries": len(took),
+        "took_p50_ms": percentile(took, 0.5),
+        "took_p95_ms": percentile(took, 0.95),
+        "wall_p50_ms": round(percentile(wall, 0.5), 2),
+        "wall_p95_ms": round(percentile(wall, 0.95), 2),
+    }
+
+
+def compare(client, payloads, profiles, language_code, queries, rounds, seed, keep):
+    rng = random.Random(seed)
+    phrases = sample_phrases(payloads, queries, rng)
+    video_ids = [rng.choice(payloads)["video_id"] for _ in range(queries)]
+    workloads = {
+        "search": [search_body(phrase) for phrase in phrases],
+        "autocomplete": [autocomplete_body(phrase) for phrase in phrases],
+        "video": [video_body(video_id) for video_id in video_ids],
+    }
+
+    report = {}
+    for profile in profiles:
+        index_name = f"profile-compare-{profile}"
+        if client.indices.exists(index=index_name):
+            client.indices.delete(index=index_name)
+        try:
+            print(f"Loading {len(payloads)} transcripts into {index_name}...")
+            report[profile] = build_profile_index(client, index_name, profile, payloads, language_code)
+            report[profile]["latency"] = {
+                name: measure(client, index_name, bodies, rounds) for name, bodies in workloads.items()
+            }
+        finally:
+            if not keep:
+                client.indices.delete(index=index_name, ignore_unavailable=True)
+    return report
+
+
+def print_report(report):
+    profiles = list(report)
+    baseline = report[profiles[0]]
+    print("\n=== Mapping Profile Comparison ===")
+    print(f"{'':<26}" + "".join(f"{profile:>14}" for profile in profiles))
+    print(f"{'documents':<26}" + "".join(f"{report[p]['docs']:>14}" for p in profiles))
+    print(f"{'store size (MB)':<26}" + "".join(f"{report[p]['store_bytes'] / 1024 / 1024:>14.2f}" for p in profiles))
+    for workload in baseline["latency"]:
+        for metric in ("took_p50_ms", "took_p95_ms", "wall_p50_ms", "wall_p95_ms"):
+            label = f"{workload} {metric[:-3].replace('_', ' ')} (ms)"
+            print(f"{label:<26}" + "".join(f"{report[p]['latency'][workload][metric]:>14}" for p in profiles))
+    for profile in profiles[1:]:
+        saved = 1 - report[profile]["store_bytes"] / (baseline["store_bytes"] or 1)
+        print(f"{profile} vs {profiles[0]}: {saved:.1%} smaller on disk")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Compare index size and query latency of the mapping profiles on a sample of the archive",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Builds one scratch index per profile from the same archived transcripts,
+force-merges it, records the primary store size, then times the backend's
+search, autocomplete and video queries against each.
+
+Examples:
+  python compare_profiles.py                          # 200 English transcripts, default vs compact
+  python compare_profiles.py --max-files 2000 --rounds 5
+  python compare_profiles.py --lang es --json-out profile_report.json
+        """
+    )
+    parser.add_argument("--max-files", type=int, default=200, help="Transcripts to load into each scratch index")
+    parser.add_argument("--lang", default="en", help="Only use transcripts of this language (analyzer choice)")
+    parser.add_argument("--profiles", nargs="+", choices=MAPPING_PROFILES, default=list(MAPPING_PROFILES), help="Profiles to compare; the first is the baseline")
+    parser.add_argument("--queries", type=int, default=100, help="Distinct queries per workload")
+    parser.add_argument("--rounds", type=int, default=3, help="Timed passes over the queries")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for query sampling")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch indices afterwards")
+    parser.add_argument("--json-out", help="Write the report as JSON to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    payloads = load_sample(args.max_files, args.lang)
+    if not payloads:
+        print(f"Error: no archived {args.lang} transcripts found in ingestion/store or ingestion/transcripts")
+        exit(1)
+
+    client = get_opensearch_client(
+        EC2_OPENSEARCH_HOST,
+        EC2_OPENSEARCH_PORT,
+        EC2_OPENSEARCH_USERNAME,
+        EC2_OPENSEARCH_PASSWORD,
+        use_ssl=EC2_OPENSEARCH_USE_SSL,
+        verify_certs=EC2_OPENSEARCH_VERIFY_CERTS,
+    )
+
+    report = compare(client, payloads, args.profiles, args.lang, args.queries, args.rounds, args.seed, args.keep)
+    print_report(report)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved profile report to: {args.json_out}")
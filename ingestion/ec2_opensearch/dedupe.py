@@ -0,0 +1,232 @@
+import os
+import re
+import json
+import random
+import sqlite3
+import hashlib
+from array import array
+from datetime import datetime
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Settings below are read at import time, whichever script imports this first
+load_dotenv()
+
+# Near-duplicate detection for boilerplate (intros, outros, sponsor reads) that
+# channels repeat across videos. Segments and their sentences are reduced to MinHash
+# signatures and bucketed with LSH; the buckets persist in SQLite so later runs
+# see earlier videos.
+DEDUPE_MODE = os.getenv("DEDUPE_MODE", "flag")  # "off", "flag" or "drop"
+DEDUPE_DB = os.getenv("DEDUPE_DB", str(Path(__file__).resolve().parent.parent / "dedupe_index.sqlite"))
+DEDUPE_THRESHOLD = float(os.getenv("DEDUPE_THRESHOLD", "0.8"))
+DEDUPE_MIN_TOKENS = int(os.getenv("DEDUPE_MIN_TOKENS", "8"))
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+MERSENNE_PRIME = (1 << 61) - 1
+
+# Fixed seed: signatures must be comparable across runs
+_rng = random.Random(1)
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").lower())
+
+
+def shingles(tokens, size=SHINGLE_SIZE):
+    if len(tokens) < size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def minhash(shingle_set):
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") % MERSENNE_PRIME
+              for s in shingle_set]
+    return [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in PERMUTATIONS]
+
+
+def estimated_similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def band_keys(signature):
+    for band in range(BANDS):
+        rows = array("Q", signature[band * ROWS:(band + 1) * ROWS]).tobytes()
+        yield band, hashlib.blake2b(rows, digest_size=8).digest()
+
+
+class Deduper:
+    """
+    Persistent MinHash/LSH index of segment and sentence signatures.
+
+    Text is a duplicate when text from a different video with estimated
+    Jaccard similarity >= threshold was recorded first. Only unique text is
+    recorded. Re-running the same video is therefore stable: its own earlier
+    signatures are recognised, and it keeps ownership of text it introduced
+    first.
+
+    Windows overlap, so a repeated intro or sponsor sentence sits next to a
+    different sentence in every video and its windows rarely match as a
+    whole. Each sentence is therefore also checked on its own, and a window
+    is a duplicate when it matches as a whole or when duplicate sentences
+    make up at least half of its words.
+    """
+
+    def __init__(self, db_path=DEDUPE_DB, threshold=DEDUPE_THRESHOLD, min_tokens=DEDUPE_MIN_TOKENS):
+        self.threshold = threshold
+        self.min_tokens = min_tokens
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                video_id TEXT NOT NULL,
+                signature BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bands (
+                band INTEGER NOT NULL,
+                bucket BLOB NOT NULL,
+                signature_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, bucket);
+        """)
+        self.stats = {
+            "segments": 0, "checked": 0, "duplicates": 0, "duplicate_bytes": 0, "total_bytes": 0,
+            "sentences": 0, "sentences_checked": 0, "duplicate_sentences": 0,
+        }
+
+    def _candidates(self, signature):
+        ids = set()
+        for band, bucket in band_keys(signature):
+            rows = self.conn.execute(
+                "SELECT signature_id FROM bands WHERE band = ? AND bucket = ?", (band, bucket)
+            ).fetchall()
+            ids.update(row[0] for row in rows)
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        rows = self.conn.execute(
+            f"SELECT id, video_id, signature FROM signatures WHERE id IN ({placeholders})", tuple(ids)
+        ).fetchall()
+        return [(row_id, video_id, array("Q", blob).tolist()) for row_id, video_id, blob in rows]
+
+    def _record(self, video_id, signature):
+        cursor = self.conn.execute(
+            "INSERT INTO signatures (video_id, signature) VALUES (?, ?)",
+            (video_id, array("Q", signature).tobytes()),
+        )
+        self.conn.executemany(
+            "INSERT INTO bands (band, bucket, signature_id) VALUES (?, ?, ?)",
+            [(band, bucket, cursor.lastrowid) for band, bucket in band_keys(signature)],
+        )
+
+    def _check(self, video_id, tokens):
+        """Look up a signature, recording it when it is new; True if another video owns it."""
+        signature = minhash(shingles(tokens))
+        own_id = None
+        other_ids = []
+        for row_id, candidate_video, candidate_sig in self._candidates(signature):
+            if estimated_similarity(signature, candidate_sig) < self.threshold:
+                continue
+            if candidate_video == video_id:
+                own_id = row_id if own_id is None else min(own_id, row_id)
+            else:
+                other_ids.append(row_id)
+
+        if own_id is None:
+            if not other_ids:
+                self._record(video_id, signature)
+            return bool(other_ids)
+        return any(other_id < own_id for other_id in other_ids)
+
+    def is_duplicate_sentence(self, video_id, text):
+        self.stats["sentences"] += 1
+        tokens = tokenize(text)
+        if len(tokens) < self.min_tokens:
+            # Short utterances ("yeah", "thank you") repeat naturally; never treat them as boilerplate
+            return False
+        self.stats["sentences_checked"] += 1
+        duplicate = self._check(video_id, tokens)
+        if duplicate:
+            self.stats["duplicate_sentences"] += 1
+        return duplicate
+
+    def is_duplicate(self, video_id, text, duplicate_sentences=()):
+        """
+        Whether a window is boilerplate. duplicate_sentences are the texts of
+        its member sentences that is_duplicate_sentence() flagged.
+        """
+        size = len((text or "").encode("utf-8"))
+        self.stats["segments"] += 1
+        self.stats["total_bytes"] += size
+
+        tokens = tokenize(text)
+        duplicate = False
+        if len(tokens) >= self.min_tokens:
+            self.stats["checked"] += 1
+            duplicate = self._check(video_id, tokens)
+        if not duplicate and duplicate_sentences:
+            duplicate_tokens = sum(len(tokenize(sentence)) for sentence in duplicate_sentences)
+            duplicate = 2 * duplicate_tokens >= len(tokens)
+
+        if duplicate:
+            self.stats["duplicates"] += 1
+            self.stats["duplicate_bytes"] += size
+        return duplicate
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def report(self, mode=DEDUPE_MODE):
+        """
+        Duplicate counts for the run. Only drop mode keeps duplicate text out
+        of the index, so bytes_saved is zero otherwise; in flag mode the
+        duplicates are still stored and only excluded from search.
+        """
+        segments = self.stats["segments"] or 1
+        total_bytes = self.stats["total_bytes"] or 1
+        return {
+            "generated_at": datetime.now().isoformat(),
+            "mode": mode,
+            "threshold": self.threshold,
+            **self.stats,
+            "duplicate_segment_ratio": round(self.stats["duplicates"] / segments, 4),
+            "duplicate_text_ratio": round(self.stats["duplicate_bytes"] / total_bytes, 4),
+            "bytes_saved": self.stats["duplicate_bytes"] if mode == "drop" else 0,
+        }
+
+
+def open_deduper(mode=DEDUPE_MODE):
+    return None if mode == "off" else Deduper()
+
+
+def write_report(deduper, mode=DEDUPE_MODE, report_path=None):
+    """Print the duplicate summary and write it next to the dedupe index."""
+    report = deduper.report(mode)
+    action = "dropped" if mode == "drop" else "flagged as boilerplate"
+    print(f"\n=== Near-duplicate Summary ===")
+    print(f"Segments seen: {report['segments']} ({report['checked']} long enough to check)")
+    print(f"Sentences seen: {report['sentences']} ({report['sentences_checked']} long enough to check), "
+          f"{report['duplicate_sentences']} repeated from other videos")
+    print(f"Duplicates {action}: {report['duplicates']} ({report['duplicate_segment_ratio']:.1%} of segments)")
+    print(f"Duplicate text: {report['duplicate_bytes']} of {report['total_bytes']} bytes ({report['duplicate_text_ratio']:.1%})")
+    if mode == "drop":
+        print(f"Not indexed: {report['bytes_saved']} bytes")
+    else:
+        print("Duplicates are still indexed (excluded from search); use DEDUPE_MODE=drop to save the space")
+    report_path = Path(report_path) if report_path else Path(DEDUPE_DB).with_name("dedupe_report.json")
+    with report_path.open("w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved dedupe report to: {report_path}")
+    return report
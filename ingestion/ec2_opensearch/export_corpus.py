@@ -0,0 +1,277 @@
+import gzip
+import json
+import argparse
+import threading
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from opensearchpy import helpers
+from push_transcript import (
+    EC2_OPENSEARCH_HOST,
+    EC2_OPENSEARCH_PORT,
+    EC2_OPENSEARCH_USERNAME,
+    EC2_OPENSEARCH_PASSWORD,
+    EC2_OPENSEARCH_USE_SSL,
+    EC2_OPENSEARCH_VERIFY_CERTS,
+    INDEX_BASE_NAME,
+    BULK_CHUNK_SIZE,
+    get_opensearch_client,
+    routing_language,
+    ensure_write_target,
+)
+
+PIT_KEEP_ALIVE = "5m"
+# Groups each video's segments together so shards compress well. _id breaks
+# ties, so search_after never skips or repeats legacy documents that have no
+# segment_index and share a start_time
+EXPORT_SORT = [
+    {"video_id": {"order": "asc"}},
+    {"segment_index": {"order": "asc", "missing": "_last", "unmapped_type": "integer"}},
+    {"start_time": {"order": "asc"}},
+    {"_id": {"order": "asc"}},
+]
+
+
+def build_export_query(video_ids=None, lang=None, query_json=None):
+    filters = []
+    if video_ids:
+        filters.append({"terms": {"video_id": video_ids}})
+    if lang:
+        filters.append({"term": {"language_code": lang}})
+    if query_json:
+        filters.append(json.loads(query_json))
+    if not filters:
+        return {"match_all": {}}
+    return {"bool": {"filter": filters}}
+
+
+def open_point_in_time(client, index_name, keep_alive=PIT_KEEP_ALIVE):
+    response = client.transport.perform_request(
+        "POST", f"/{index_name}/_search/point_in_time", params={"keep_alive": keep_alive}
+    )
+    return response["pit_id"]
+
+
+def close_point_in_time(client, pit_id):
+    try:
+        client.transport.perform_request("DELETE", "/_search/point_in_time", body={"pit_id": [pit_id]})
+    except Exception as e:
+        print(f"Warning: could not delete point in time: {e}")
+
+
+def iter_slice(client, pit_id, query, slice_id, slices, page_size):
+    """Yield every hit in one slice of the point in time, paging with search_after."""
+    search_after = None
+    while True:
+        body = {
+            "pit": {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+            "query": query,
+            "sort": EXPORT_SORT,
+            "size": page_size,
+        }
+        if slices > 1:
+            body["slice"] = {"id": slice_id, "max": slices}
+        if search_after is not None:
+            body["search_after"] = search_after
+        hits = client.search(body=body)["hits"]["hits"]
+        if not hits:
+            return
+        yield from hits
+        search_after = hits[-1]["sort"]
+
+
+class ShardWriter:
+    """Write NDJSON lines to gzip files, starting a new file every max_docs documents."""
+
+    def __init__(self, output_dir, prefix, max_docs):
+        self.output_dir = Path(output_dir)
+        self.prefix = prefix
+        self.max_docs = max_docs
+        self.files = []
+        self.handle = None
+        self.docs_in_file = 0
+
+    def _open_next(self):
+        self.close()
+        path = self.output_dir / f"{self.prefix}-{len(self.files):04d}.ndjson.gz"
+        self.handle = gzip.open(path, "wt", encoding="utf-8")
+        self.files.append({"name": path.name, "docs": 0})
+        self.docs_in_file = 0
+
+    def write(self, record):
+        if self.handle is None or self.docs_in_file >= self.max_docs:
+            self._open_next()
+        self.handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.docs_in_file += 1
+        self.files[-1]["docs"] += 1
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+
+def export_slice(client, pit_id, query, slice_id, slices, output_dir, page_size, max_docs):
+    writer = ShardWriter(output_dir, f"part-{slice_id:03d}", max_docs)
+    try:
+        for hit in iter_slice(client, pit_id, query, slice_id, slices, page_size):
+            writer.write({"_id": hit["_id"], "_index": hit["_index"], "_source": hit["_source"]})
+    finally:
+        writer.close()
+    return writer.files
+
+
+def export_corpus(client, index_name, output_dir, query, slices=4, page_size=1000, max_docs=100000):
+    """
+    Stream the index (or the documents matching query) into gzip NDJSON shards.
+    All slices read the same point in time in parallel, so the export is a
+    consistent snapshot even while ingestion keeps writing.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    pit_id = open_point_in_time(client, index_name)
+    try:
+        with ThreadPoolExecutor(max_workers=slices) as pool:
+            futures = [
+                pool.submit(export_slice, client, pit_id, query, slice_id, slices, output_dir, page_size, max_docs)
+                for slice_id in range(slices)
+            ]
+            files = [f for future in futures for f in future.result()]
+    finally:
+        close_point_in_time(client, pit_id)
+
+    for f in files:
+        f["bytes"] = (output_dir / f["name"]).stat().st_size
+    manifest = {
+        "created_at": datetime.now().isoformat(),
+        "source_index": index_name,
+        "query": query,
+        "slices": slices,
+        "total_docs": sum(f["docs"] for f in files),
+        "total_bytes": sum(f["bytes"] for f in files),
+        "files": files,
+    }
+    with (output_dir / "manifest.json").open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def iter_shard_actions(shard_path, resolve_index):
+    with gzip.open(shard_path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            source = record["_source"]
+            yield {
+                "_index": resolve_index(source),
+                "_id": record["_id"],
+                "_source": source,
+            }
+
+
+def import_corpus(client, input_dir, target_index=None, workers=4, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Bulk-load every shard in input_dir, one shard per worker. Documents keep
+    their IDs, so re-running an import is idempotent. Without target_index,
+    each document is routed to its language's write alias.
+    """
+    shards = sorted(Path(input_dir).glob("*.ndjson.gz"))
+    if not shards:
+        raise FileNotFoundError(f"No .ndjson.gz shards found in {input_dir}")
+
+    write_targets = {}
+    targets_lock = threading.Lock()
+
+    def resolve_index(source):
+        if target_index:
+            return target_index
+        key = routing_language(source.get("language_code"))
+        with targets_lock:
+            if key not in write_targets:
+                write_targets[key] = ensure_write_target(client, source.get("language_code"))
+            return write_targets[key]
+
+    def load_shard(shard_path):
+        success, errors = helpers.bulk(
+            client,
+            iter_shard_actions(shard_path, resolve_index),
+            chunk_size=chunk_size,
+            raise_on_error=False,
+            request_timeout=120,
+        )
+        status = "✓" if not errors else "✗"
+        print(f"{status} {shard_path.name}: {success} documents, {len(errors)} errors")
+        return success, len(errors)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(load_shard, shards))
+
+    loaded = sum(success for success, _ in results)
+    failed = sum(errors for _, errors in results)
+    refresh_targets = [target_index] if target_index else list(write_targets.values())
+    for index_name in refresh_targets:
+        client.indices.refresh(index=index_name)
+    return loaded, failed
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Export the transcript index to compressed NDJSON shards, or import such shards",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python export_corpus.py export --output backups/2024-06-01             # Whole corpus, 4 parallel slices
+  python export_corpus.py export --output seed --lang en --slices 8
+  python export_corpus.py export --output one --video-id dQw4w9WgXcQ
+  python export_corpus.py import --input backups/2024-06-01               # Route by language to write aliases
+  python export_corpus.py import --input seed --index youtube-transcripts-en-v3 --workers 8
+        """
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Stream the index into NDJSON shards")
+    export_parser.add_argument("--output", required=True, help="Directory to write shards and manifest.json to")
+    export_parser.add_argument("--index", default=INDEX_BASE_NAME, help="Index or alias to export")
+    export_parser.add_argument("--slices", type=int, default=4, help="Parallel slices (usually the shard count)")
+    export_parser.add_argument("--page-size", type=int, default=1000, help="Documents per search_after page")
+    export_parser.add_argument("--max-docs-per-file", type=int, default=100000, help="Documents per shard file")
+    export_parser.add_argument("--video-id", action="append", help="Only export this video (repeatable)")
+    export_parser.add_argument("--lang", help="Only export this language_code")
+    export_parser.add_argument("--query-json", help="Extra filter clause as JSON, e.g. '{\"range\": {...}}'")
+
+    import_parser = subparsers.add_parser("import", help="Bulk-load NDJSON shards")
+    import_parser.add_argument("--input", required=True, help="Directory containing .ndjson.gz shards")
+    import_parser.add_argument("--index", help="Load everything into this index (default: per-language write aliases)")
+    import_parser.add_argument("--workers", type=int, default=4, help="Shards loaded in parallel")
+    import_parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="Documents per bulk request")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    client = get_opensearch_client(
+        EC2_OPENSEARCH_HOST,
+        EC2_OPENSEARCH_PORT,
+        EC2_OPENSEARCH_USERNAME,
+        EC2_OPENSEARCH_PASSWORD,
+        use_ssl=EC2_OPENSEARCH_USE_SSL,
+        verify_certs=EC2_OPENSEARCH_VERIFY_CERTS,
+    )
+
+    if args.command == "export":
+        query = build_export_query(args.video_id, args.lang, args.query_json)
+        manifest = export_corpus(
+            client, args.index, args.output, query,
+            slices=max(1, args.slices),
+            page_size=args.page_size,
+            max_docs=args.max_docs_per_file,
+        )
+        print(f"Exported {manifest['total_docs']} documents into {len(manifest['files'])} shards "
+              f"({manifest['total_bytes'] / 1024 / 1024:.1f} MB) in {args.output}")
+    else:
+        loaded, failed = import_corpus(client, args.input, args.index, args.workers, args.chunk_size)
+        print(f"Imported {loaded} documents ({failed} failed)")
+        if failed:
+            exit(1)
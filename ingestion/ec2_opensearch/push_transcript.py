@@ -1,13 +1,18 @@
 import os
-from opensearchpy import OpenSearch, RequestsHttpConnection
+import re
+from opensearchpy import OpenSearch, RequestsHttpConnection, helpers
 from dotenv import load_dotenv
 import json
 from pathlib import Path
 import shutil
 
-# Load environment variables from a .env file if present
+# Load environment variables from a .env file if present, before the local
+# modules below read their settings
 load_dotenv()
 
+from segment_transcript import segment_transcript
+from dedupe import DEDUPE_MODE, open_deduper, write_report
+
 EC2_OPENSEARCH_HOST = os.getenv("EC2_OPENSEARCH_HOST")
 EC2_OPENSEARCH_PORT = int(os.getenv("EC2_OPENSEARCH_PORT", "9200"))
 EC2_OPENSEARCH_USERNAME = os.getenv("EC2_OPENSEARCH_USERNAME")
@@ -16,6 +21,30 @@ EC2_OPENSEARCH_USE_SSL = os.getenv("EC2_OPENSEARCH_USE_SSL", "false").lower() ==
 EC2_OPENSEARCH_VERIFY_CERTS = os.getenv("EC2_OPENSEARCH_VERIFY_CERTS", "false").lower() == "true"
 TRANSCRIPT_FILE = os.getenv("TRANSCRIPT_FILE")
 
+# Transcripts are routed to one index family per language. Physical indices are
+# versioned (youtube-transcripts-en-v1, -v2, ...) and reached through a per-language
+# read alias (youtube-transcripts-en) and write alias (youtube-transcripts-en-write).
+# Every language index is also in the global read alias (the base name).
+INDEX_BASE_NAME = os.getenv("INDEX_BASE_NAME", "youtube-transcripts")
+INDEX_SHARDS = int(os.getenv("INDEX_SHARDS", "1"))
+INDEX_REPLICAS = int(os.getenv("INDEX_REPLICAS", "1"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+# "default" or "compact"; see build_index_body(). Only applies to newly created
+# indices, so switch an existing corpus over with reindex.py --profile compact.
+MAPPING_PROFILE = os.getenv("MAPPING_PROFILE", "default")
+MAPPING_PROFILES = ("default", "compact")
+
+# Built-in OpenSearch language analyzers by ISO 639-1 code; others use "standard"
+LANGUAGE_ANALYZERS = {
+    "ar": "arabic", "hy": "armenian", "eu": "basque", "bn": "bengali", "bg": "bulgarian",
+    "ca": "catalan", "zh": "cjk", "ja": "cjk", "ko": "cjk", "cs": "czech", "da": "danish",
+    "nl": "dutch", "en": "english", "et": "estonian", "fi": "finnish", "fr": "french",
+    "gl": "galician", "de": "german", "el": "greek", "hi": "hindi", "hu": "hungarian",
+    "id": "indonesian", "ga": "irish", "it": "italian", "lv": "latvian", "lt": "lithuanian",
+    "no": "norwegian", "nb": "norwegian", "fa": "persian", "pt": "portuguese", "ro": "romanian",
+    "ru": "russian", "es": "spanish", "sv": "swedish", "tr": "turkish", "th": "thai",
+}
+
 
 def get_opensearch_client(host, port, username, password, use_ssl=False, verify_certs=False):
     return OpenSearch(
@@ -27,38 +56,232 @@ def get_opensearch_client(host, port, username, password, use_ssl=False, verify_
     )
 
 
-def create_index_if_not_exists(client, index_name="youtube-transcripts"):
-    index_body = {
-        "settings": {"number_of_shards": 1},
+def routing_language(language_code):
+    """Reduce a transcript language code (e.g. "en-GB") to the index routing key ("en")."""
+    primary = (language_code or "").split("-")[0].split("_")[0].strip().lower()
+    if re.fullmatch(r"[a-z]{2,3}", primary):
+        return primary
+    return "unknown"
+
+
+def language_index_base(language_code, base_name=INDEX_BASE_NAME):
+    return f"{base_name}-{routing_language(language_code)}"
+
+
+def read_alias_name(base_name=INDEX_BASE_NAME):
+    return base_name
+
+
+def write_alias_name(base_name=INDEX_BASE_NAME):
+    return f"{base_name}-write"
+
+
+def versioned_index_name(version, base_name=INDEX_BASE_NAME):
+    return f"{base_name}-v{version}"
+
+
+# Video metadata copied onto every segment (payload "video", from get_video.py)
+# so /search can filter by channel, date and length without a join
+VIDEO_METADATA_PROPERTIES = {
+    "title": {"type": "text", "index": False},
+    "channel_id": {"type": "keyword"},
+    "channel_title": {"type": "keyword"},
+    "published_at": {"type": "date"},
+    "duration_seconds": {"type": "integer"},
+}
+VIDEO_METADATA_FIELDS = tuple(VIDEO_METADATA_PROPERTIES)
+
+
+def build_index_body(number_of_shards=INDEX_SHARDS, number_of_replicas=INDEX_REPLICAS, language_code=None,
+                     profile=MAPPING_PROFILE):
+    """
+    The "compact" profile trims what the queries never use: timings become
+    scaled_float (stored as whole milliseconds, still seconds in _source and
+    queries) and text drops length norms, which only matter for scoring
+    fragments of very different lengths. Text already indexes positions
+    without offsets by default, which phrase matching needs, so there is
+    nothing to trim there. Segments are stored sorted by video_id,
+    segment_index (index sorting rejects scaled_float, and segment_index
+    follows start_time within a video), so a video's context lookups read
+    adjacent doc values, with the denser stored-field codec.
+    """
+    if profile not in MAPPING_PROFILES:
+        raise ValueError(f"Unknown mapping profile {profile!r}; expected one of {', '.join(MAPPING_PROFILES)}")
+
+    # Stemming helps learners match inflected forms; stopwords are kept because
+    # phrases like "how are you" are mostly stopwords.
+    analyzer_type = LANGUAGE_ANALYZERS.get(routing_language(language_code), "standard")
+    body = {
+        "settings": {
+            "number_of_shards": number_of_shards,
+            "number_of_replicas": number_of_replicas,
+            "analysis": {
+                "analyzer": {
+                    "transcript_text": {"type": analyzer_type, "stopwords": "_none_"},
+                }
+            },
+        },
         "mappings": {
             "properties": {
                 "video_id": {"type": "keyword"},
                 "language_code": {"type": "keyword"},
                 "start_time": {"type": "float"},
                 "end_time": {"type": "float"},
-                "text": {"type": "text"},
+                "text": {"type": "text", "analyzer": "transcript_text"},
+                "segment_index": {"type": "integer"},
+                "boilerplate": {"type": "boolean"},
+                # Context returned with each hit; stored only, never searched
+                "previous": {"type": "object", "enabled": False},
+                **VIDEO_METADATA_PROPERTIES,
             }
         },
     }
 
+    if profile == "compact":
+        properties = body["mappings"]["properties"]
+        properties["start_time"] = {"type": "scaled_float", "scaling_factor": 1000}
+        properties["end_time"] = {"type": "scaled_float", "scaling_factor": 1000}
+        properties["text"]["norms"] = False
+        body["settings"].update({
+            "codec": "best_compression",
+            "sort.field": ["video_id", "segment_index"],
+            "sort.order": ["asc", "asc"],
+        })
+    return body
+
+
+def create_index_if_not_exists(client, index_name, index_body=None):
     if not client.indices.exists(index=index_name):
-        client.indices.create(index=index_name, body=index_body)
+        client.indices.create(index=index_name, body=index_body or build_index_body())
         print(f"Created index: {index_name}")
     else:
         print(f"Index already exists: {index_name}")
 
 
-def store_transcript(client, index_name, video_id, language_code, transcript_entries):
-    for entry in transcript_entries:
-        doc = {
-            "video_id": video_id,
-            "language_code": language_code,
-            "start_time": entry["start"],
-            "end_time": entry["start"] + entry["duration"],
-            "text": entry["text"],
+def list_index_versions(client, base_name=INDEX_BASE_NAME):
+    """Return the version numbers of existing physical indices for base_name, ascending."""
+    prefix = f"{base_name}-v"
+    indices = client.indices.get(index=f"{prefix}*", ignore_unavailable=True, allow_no_indices=True)
+    versions = []
+    for name in indices:
+        suffix = name[len(prefix):]
+        if suffix.isdigit():
+            versions.append(int(suffix))
+    return sorted(versions)
+
+
+def get_alias_indices(client, alias_name):
+    if not client.indices.exists_alias(name=alias_name):
+        return []
+    return sorted(client.indices.get_alias(name=alias_name).keys())
+
+
+def ensure_metadata_mapping(client, index_name):
+    """
+    Add the video metadata fields to an index created before they existed, so
+    they are not dynamically mapped as text. Adding fields is allowed on a live
+    index and is a no-op when they are already mapped.
+    """
+    client.indices.put_mapping(index=index_name, body={"properties": VIDEO_METADATA_PROPERTIES})
+
+
+def ensure_write_target(client, language_code, base_name=INDEX_BASE_NAME):
+    """
+    Return the name to index new documents of the given language into.
+    Uses the language's write alias when it exists. A legacy, unversioned
+    index named base_name is written to directly until reindex.py migrates it.
+    Otherwise version 1 of the language index is created with its read and
+    write aliases and added to the global read alias.
+    """
+    language_base = language_index_base(language_code, base_name)
+    read_alias = read_alias_name(language_base)
+    write_alias = write_alias_name(language_base)
+
+    if client.indices.exists_alias(name=write_alias):
+        ensure_metadata_mapping(client, write_alias)
+        return write_alias
+
+    global_alias = read_alias_name(base_name)
+    if client.indices.exists(index=global_alias) and not client.indices.exists_alias(name=global_alias):
+        print(f"Legacy index {global_alias} has no aliases; run reindex.py to migrate it to per-language indices")
+        ensure_metadata_mapping(client, global_alias)
+        return global_alias
+
+    index_name = versioned_index_name(1, language_base)
+    create_index_if_not_exists(
+        client, index_name, build_index_body(language_code=language_code)
+    )
+    client.indices.update_aliases(body={"actions": [
+        {"add": {"index": index_name, "alias": read_alias}},
+        {"add": {"index": index_name, "alias": write_alias, "is_write_index": True}},
+        {"add": {"index": index_name, "alias": global_alias}},
+    ]})
+    print(f"Aliases {read_alias}, {write_alias}, {global_alias} -> {index_name}")
+    return write_alias
+
+
+def build_documents(index_name, video_id, language_code, transcript_entries, deduper=None, dedupe_mode=DEDUPE_MODE,
+                    video=None):
+    """
+    Yield bulk index actions for one transcript, re-segmented into sentence
+    windows. Document IDs are derived from the video and segment position so
+    re-pushing a transcript overwrites instead of duplicating. With a deduper,
+    segments repeated from other videos, as a whole or mostly sentence by
+    sentence, are flagged as boilerplate or dropped. The video's metadata,
+    when known, is copied onto every segment.
+    """
+    video = video or {}
+    metadata = {field: video[field] for field in VIDEO_METADATA_FIELDS if video.get(field) is not None}
+    duplicate_sentence = {}  # sentence position -> verdict; windows overlap, so check each sentence once
+    for segment_index, segment in enumerate(segment_transcript(transcript_entries)):
+        previous = segment["previous"]
+        boilerplate = False
+        if deduper is not None:
+            duplicate_sentences = []
+            for position, sentence in enumerate(segment["sentences"], start=segment["first_sentence"]):
+                if position not in duplicate_sentence:
+                    duplicate_sentence[position] = deduper.is_duplicate_sentence(video_id, sentence["text"])
+                if duplicate_sentence[position]:
+                    duplicate_sentences.append(sentence["text"])
+            boilerplate = deduper.is_duplicate(video_id, segment["text"], duplicate_sentences)
+        if boilerplate and dedupe_mode == "drop":
+            continue
+        yield {
+            "_index": index_name,
+            "_id": f"{video_id}:{segment_index}",
+            "_source": {
+                "video_id": video_id,
+                "language_code": language_code,
+                "start_time": segment["start"],
+                "end_time": segment["end"],
+                "text": segment["text"],
+                "segment_index": segment_index,
+                "previous": {
+                    "start_time": previous["start"],
+                    "end_time": previous["end"],
+                    "text": previous["text"],
+                } if previous else None,
+                "boilerplate": boilerplate,
+                **metadata,
+            },
         }
-        client.index(index=index_name, body=doc)
-    print(f"Stored {len(transcript_entries)} transcript entries for video {video_id}")
+
+
+def store_transcript(client, index_name, video_id, language_code, transcript_entries, deduper=None, video=None):
+    success, errors = helpers.bulk(
+        client,
+        build_documents(index_name, video_id, language_code, transcript_entries, deduper, video=video),
+        chunk_size=BULK_CHUNK_SIZE,
+        raise_on_error=False,
+    )
+    if errors:
+        if deduper is not None:
+            deduper.rollback()
+        raise RuntimeError(f"{len(errors)} transcript entries failed to index for video {video_id}: {errors[0]}")
+    if deduper is not None:
+        # Only remember this video's signatures once its documents are indexed
+        deduper.commit()
+    print(f"Stored {success} segments from {len(transcript_entries)} transcript entries for video {video_id}")
 
 
 
@@ -128,8 +351,6 @@ def load_transcript_payload(file_path: str = None):
 
 
 if __name__ == "__main__":
-    INDEX_NAME = "youtube-transcripts"
-
     client = get_opensearch_client(
         EC2_OPENSEARCH_HOST,
         EC2_OPENSEARCH_PORT,
@@ -138,7 +359,14 @@ if __name__ == "__main__":
         use_ssl=EC2_OPENSEARCH_USE_SSL,
         verify_certs=EC2_OPENSEARCH_VERIFY_CERTS,
     )
-    create_index_if_not_exists(client, INDEX_NAME)
+    write_targets = {}
+    deduper = open_deduper()
+
+    def write_target_for(language_code):
+        key = routing_language(language_code)
+        if key not in write_targets:
+            write_targets[key] = ensure_write_target(client, language_code)
+        return write_targets[key]
 
     # If TRANSCRIPT_FILE is specified, process only that file
     if TRANSCRIPT_FILE:
@@ -147,10 +375,12 @@ if __name__ == "__main__":
             payload = load_transcript_payload(TRANSCRIPT_FILE)
             store_transcript(
                 client,
-                INDEX_NAME,
+                write_target_for(payload.get("language_code")),
                 video_id=payload["video_id"],
                 language_code=payload.get("language_code", "unknown"),
                 transcript_entries=payload["entries"],
+                deduper=deduper,
+                video=payload.get("video"),
             )
             
             # Move to storage after successful processing
@@ -195,10 +425,12 @@ if __name__ == "__main__":
                 # Store in OpenSearch
                 store_transcript(
                     client,
-                    INDEX_NAME,
+                    write_target_for(payload.get("language_code")),
                     video_id=payload["video_id"],
                     language_code=payload.get("language_code", "unknown"),
                     transcript_entries=payload["entries"],
+                    deduper=deduper,
+                    video=payload.get("video"),
                 )
                 
                 # Move to storage after successful processing
@@ -216,3 +448,7 @@ if __name__ == "__main__":
         print(f"Successfully processed: {processed_count}")
         print(f"Failed: {failed_count}")
         print("Indexing complete.")
+
+    if deduper is not None:
+        write_report(deduper)
+        deduper.close()
@@ -1,5 +1,5 @@
 import os
-from opensearchpy import OpenSearch, RequestsHttpConnection
+from opensearchpy import OpenSearch, RequestsHttpConnection, helpers
 from dotenv import load_dotenv
 import argparse
 
@@ -25,20 +25,24 @@ def get_opensearch_client(host, port, username, password, use_ssl=False, verify_
 
 
 def read_transcript_by_video(client, index_name, video_id):
-    response = client.search(
+    """Return every segment of a video in time order (scrolls, so long videos are not truncated)."""
+    hits = helpers.scan(
+        client,
         index=index_name,
-        body={
+        query={
             "query": {"term": {"video_id": video_id}},
-            "size": 1000,
+            "sort": [{"start_time": {"order": "asc"}}],
         },
+        size=1000,
+        preserve_order=True,
     )
-    return [hit["_source"] for hit in response["hits"]["hits"]]
+    return [hit["_source"] for hit in hits]
 
 
-def search_transcripts(client, index_name, query_text):
+def search_transcripts(client, index_name, query_text, size=100):
     response = client.search(
         index=index_name,
-        body={"query": {"match": {"text": query_text}}, "size": 100},
+        body={"query": {"match": {"text": query_text}}, "size": size},
     )
     return [hit["_source"] for hit in response["hits"]["hits"]]
 
@@ -57,12 +61,20 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Search for a phrase in OpenSearch transcripts")
     parser.add_argument("--query", "-q", help="Phrase to search in transcript text")
+    parser.add_argument("--size", type=int, default=100, help="Maximum number of search results")
+    parser.add_argument("--video-id", help="Print the full transcript of a video")
     args = parser.parse_args()
 
-    if args.query:
-        keyword_results = search_transcripts(client, INDEX_NAME, args.query)
+    if args.video_id:
+        video_transcripts = read_transcript_by_video(client, INDEX_NAME, args.video_id)
+        print(f"Transcript for video {args.video_id} ({len(video_transcripts)} segments):")
+        for entry in video_transcripts:
+            print(f"[{entry['start_time']:.2f}-{entry['end_time']:.2f}] {entry['text']}")
+    elif args.query:
+        keyword_results = search_transcripts(client, INDEX_NAME, args.query, args.size)
         print(f"\nSearch results for '{args.query}':")
         for entry in keyword_results:
             print(f"[{entry['video_id']}] [{entry['start_time']:.2f}-{entry['end_time']:.2f}] {entry['text']}")
     else:
-        print("Provide a search phrase with --query.")
\ No newline at end of file
+        print("Provide a search phrase with --query, or a video with --video-id.")
+        print("To dump or restore the whole index, use export_corpus.py.")
\ No newline at end of file
@@ -0,0 +1,227 @@
+import re
+import json
+import argparse
+from pathlib import Path
+from opensearchpy import helpers
+from push_transcript import (
+    EC2_OPENSEARCH_HOST,
+    EC2_OPENSEARCH_PORT,
+    EC2_OPENSEARCH_USERNAME,
+    EC2_OPENSEARCH_PASSWORD,
+    EC2_OPENSEARCH_USE_SSL,
+    EC2_OPENSEARCH_VERIFY_CERTS,
+    INDEX_BASE_NAME,
+    INDEX_SHARDS,
+    INDEX_REPLICAS,
+    BULK_CHUNK_SIZE,
+    MAPPING_PROFILE,
+    MAPPING_PROFILES,
+    get_opensearch_client,
+    read_alias_name,
+    write_alias_name,
+    versioned_index_name,
+    build_index_body,
+    routing_language,
+    language_index_base,
+    list_index_versions,
+    get_alias_indices,
+    build_documents,
+)
+from dedupe import open_deduper, write_report
+
+INGESTION_DIR = Path(__file__).resolve().parent.parent
+
+
+def iter_archive_files(include_pending=False):
+    dirs = [INGESTION_DIR / "store"]
+    if include_pending:
+        dirs.append(INGESTION_DIR / "transcripts")
+    for directory in dirs:
+        if directory.exists():
+            yield from sorted(directory.glob("*.json"))
+
+
+class LanguageIndexBuilder:
+    """Create the next versioned index for each language the first time it is seen."""
+
+    def __init__(self, client, number_of_shards, base_name=INDEX_BASE_NAME, version=None, profile=MAPPING_PROFILE):
+        self.client = client
+        self.number_of_shards = number_of_shards
+        self.profile = profile
+        self.base_name = base_name
+        self.version = version
+        self.new_indices = {}
+
+    def index_for(self, language_code):
+        language_base = language_index_base(language_code, self.base_name)
+        if language_base not in self.new_indices:
+            existing_versions = list_index_versions(self.client, language_base)
+            version = self.version or (existing_versions[-1] + 1 if existing_versions else 1)
+            index_name = versioned_index_name(version, language_base)
+            if self.client.indices.exists(index=index_name):
+                raise RuntimeError(f"{index_name} already exists")
+
+            # Load with refresh and replication off, then restore them before going live
+            index_body = build_index_body(self.number_of_shards, 0, language_code=language_code, profile=self.profile)
+            index_body["settings"]["refresh_interval"] = "-1"
+            self.client.indices.create(index=index_name, body=index_body)
+            print(f"Created index: {index_name} ({self.number_of_shards} shards, {routing_language(language_code)}, "
+                  f"{self.profile} mapping)")
+            self.new_indices[language_base] = index_name
+        return self.new_indices[language_base]
+
+
+def iter_archive_actions(builder, include_pending=False, stats=None, deduper=None):
+    stats = stats if stats is not None else {}
+    for json_file in iter_archive_files(include_pending):
+        try:
+            with json_file.open("r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except Exception as e:
+            print(f"✗ Skipping {json_file.name}: {e}")
+            stats["skipped_files"] = stats.get("skipped_files", 0) + 1
+            continue
+        if "entries" not in payload or "video_id" not in payload:
+            print(f"✗ Skipping {json_file.name}: Missing required fields (entries, video_id)")
+            stats["skipped_files"] = stats.get("skipped_files", 0) + 1
+            continue
+        stats["files"] = stats.get("files", 0) + 1
+        language_code = payload.get("language_code", "unknown")
+        yield from build_documents(
+            builder.index_for(language_code),
+            payload["video_id"],
+            language_code,
+            payload["entries"],
+            deduper,
+            video=payload.get("video"),
+        )
+
+
+def index_family(index_name):
+    return re.sub(r"-v\d+$", "", index_name)
+
+
+def switch_aliases(client, new_indices, base_name=INDEX_BASE_NAME, replace_legacy=False):
+    """
+    Point each rebuilt language's read and write aliases, and the global read
+    alias, at the new indices in a single atomic update. Languages that were not
+    rebuilt keep their aliases. Indices built before language routing
+    (youtube-transcripts-vN) are dropped from the global alias.
+    """
+    global_alias = read_alias_name(base_name)
+    replaced_families = set(new_indices) | {base_name}
+    new_index_names = set(new_indices.values())
+    actions = []
+
+    legacy_index = client.indices.exists(index=global_alias) and not client.indices.exists_alias(name=global_alias)
+    if legacy_index:
+        if not replace_legacy:
+            raise RuntimeError(
+                f"A concrete index named {global_alias} exists, so the read alias cannot be created. "
+                "Re-run with --replace-legacy to delete it as part of the alias switch."
+            )
+        actions.append({"remove_index": {"index": global_alias}})
+
+    for language_base, new_index in sorted(new_indices.items()):
+        for alias in (read_alias_name(language_base), write_alias_name(language_base)):
+            for index_name in get_alias_indices(client, alias):
+                if index_name != new_index:
+                    actions.append({"remove": {"index": index_name, "alias": alias}})
+        actions.append({"add": {"index": new_index, "alias": read_alias_name(language_base)}})
+        actions.append({"add": {"index": new_index, "alias": write_alias_name(language_base), "is_write_index": True}})
+        actions.append({"add": {"index": new_index, "alias": global_alias}})
+
+    for alias in (global_alias, write_alias_name(base_name)):
+        for index_name in get_alias_indices(client, alias):
+            if index_name not in new_index_names and index_family(index_name) in replaced_families:
+                actions.append({"remove": {"index": index_name, "alias": alias}})
+
+    client.indices.update_aliases(body={"actions": actions})
+    for language_base, new_index in sorted(new_indices.items()):
+        print(f"Aliases {read_alias_name(language_base)}, {write_alias_name(language_base)} -> {new_index}")
+    print(f"Alias {global_alias} -> {', '.join(sorted(new_index_names))}")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Build new versioned per-language transcript indices from the transcript archive and switch aliases to them",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python reindex.py                            # Build the next version of each language from ingestion/store
+  python reindex.py --shards 3 --replicas 1    # Change the shard layout
+  python reindex.py --replace-legacy           # Migrate an unversioned youtube-transcripts index
+  python reindex.py --delete-old               # Delete previous versions after the switch
+  python reindex.py --profile compact          # Rebuild with the compact mapping (see compare_profiles.py)
+        """
+    )
+    parser.add_argument("--version", type=int, help="Version number to build (default: latest + 1 per language)")
+    parser.add_argument("--shards", type=int, default=INDEX_SHARDS, help="Number of primary shards")
+    parser.add_argument("--replicas", type=int, default=INDEX_REPLICAS, help="Number of replicas once loaded")
+    parser.add_argument("--profile", choices=MAPPING_PROFILES, default=MAPPING_PROFILE, help="Mapping profile for the new indices")
+    parser.add_argument("--include-pending", action="store_true", help="Also index files still in ingestion/transcripts")
+    parser.add_argument("--replace-legacy", action="store_true", help="Delete an unversioned index that blocks the read alias")
+    parser.add_argument("--delete-old", action="store_true", help="Delete older versions after switching aliases")
+    parser.add_argument("--no-switch", action="store_true", help="Build the index but leave aliases untouched")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    client = get_opensearch_client(
+        EC2_OPENSEARCH_HOST,
+        EC2_OPENSEARCH_PORT,
+        EC2_OPENSEARCH_USERNAME,
+        EC2_OPENSEARCH_PASSWORD,
+        use_ssl=EC2_OPENSEARCH_USE_SSL,
+        verify_certs=EC2_OPENSEARCH_VERIFY_CERTS,
+    )
+
+    builder = LanguageIndexBuilder(client, args.shards, version=args.version, profile=args.profile)
+    deduper = open_deduper()
+    stats = {}
+    success, errors = helpers.bulk(
+        client,
+        iter_archive_actions(builder, args.include_pending, stats, deduper),
+        chunk_size=BULK_CHUNK_SIZE,
+        raise_on_error=False,
+    )
+    print(f"Indexed {success} documents from {stats.get('files', 0)} transcript files")
+    if deduper is not None:
+        if errors:
+            deduper.rollback()
+        write_report(deduper)
+        deduper.close()
+    new_indices = builder.new_indices
+    if errors:
+        print(f"Error: {len(errors)} documents failed to index, first error: {errors[0]}")
+        print(f"Aliases left unchanged; inspect or delete {', '.join(sorted(new_indices.values()))}")
+        exit(1)
+    if not new_indices:
+        print("No transcripts found in the archive; nothing to switch")
+        exit(1)
+
+    for new_index in new_indices.values():
+        client.indices.put_settings(
+            index=new_index,
+            body={"index": {"refresh_interval": "1s", "number_of_replicas": args.replicas}},
+        )
+        client.indices.refresh(index=new_index)
+        client.cluster.health(index=new_index, wait_for_status="yellow", timeout="60s")
+
+    if args.no_switch:
+        print(f"Built {', '.join(sorted(new_indices.values()))}; aliases not switched")
+        exit(0)
+
+    switch_aliases(client, new_indices, replace_legacy=args.replace_legacy)
+
+    if args.delete_old:
+        for family in sorted(set(new_indices) | {INDEX_BASE_NAME}):
+            for old_version in list_index_versions(client, family):
+                old_index = versioned_index_name(old_version, family)
+                if old_index not in new_indices.values():
+                    client.indices.delete(index=old_index)
+                    print(f"Deleted old index: {old_index}")
+
+    print("Reindex complete.")
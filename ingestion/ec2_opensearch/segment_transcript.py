@@ -0,0 +1,127 @@
+import os
+import re
+from dotenv import load_dotenv
+
+# Settings below are read at import time, whichever script imports this first
+load_dotenv()
+
+# Caption fragments are merged into sentence-like units, then indexed as
+# overlapping windows of SEGMENT_WINDOW sentences so phrases that cross a
+# sentence boundary still match a single document.
+SEGMENT_MODE = os.getenv("SEGMENT_MODE", "sentences")  # "sentences" or "raw"
+SEGMENT_WINDOW = int(os.getenv("SEGMENT_WINDOW", "2"))
+SEGMENT_STRIDE = int(os.getenv("SEGMENT_STRIDE", "1"))
+SEGMENT_MAX_GAP = float(os.getenv("SEGMENT_MAX_GAP", "1.5"))
+SEGMENT_MAX_DURATION = float(os.getenv("SEGMENT_MAX_DURATION", "12.0"))
+SEGMENT_MAX_WORDS = int(os.getenv("SEGMENT_MAX_WORDS", "40"))
+
+SENTENCE_END = re.compile(r"[.!?。！？…][\"'”’)\]]*$")
+
+
+def clean_fragment_text(text):
+    return " ".join((text or "").replace("\n", " ").split())
+
+
+def merge_into_sentences(transcript_entries, max_gap=SEGMENT_MAX_GAP,
+                         max_duration=SEGMENT_MAX_DURATION, max_words=SEGMENT_MAX_WORDS):
+    """
+    Merge raw caption entries ({"text", "start", "duration"}) into sentences
+    ({"text", "start", "end"}). A sentence ends at terminal punctuation, at a
+    pause longer than max_gap, or when it would exceed max_duration/max_words
+    (auto-generated captions often have no punctuation at all).
+    """
+    sentences = []
+    current = None
+    for entry in sorted(transcript_entries, key=lambda e: e["start"]):
+        text = clean_fragment_text(entry.get("text"))
+        if not text:
+            continue
+        start = entry["start"]
+        end = start + entry.get("duration", 0)
+
+        if current is not None:
+            gap = start - current["end"]
+            too_long = end - current["start"] > max_duration
+            too_many_words = current["words"] + len(text.split()) > max_words
+            if current["closed"] or gap > max_gap or too_long or too_many_words:
+                sentences.append(current)
+                current = None
+
+        if current is None:
+            current = {"text": text, "start": start, "end": end, "words": len(text.split()), "closed": False}
+        else:
+            current["text"] = f"{current['text']} {text}"
+            current["end"] = max(current["end"], end)
+            current["words"] += len(text.split())
+        current["closed"] = bool(SENTENCE_END.search(text))
+
+    if current is not None:
+        sentences.append(current)
+    return [{"text": s["text"], "start": s["start"], "end": s["end"]} for s in sentences]
+
+
+def sliding_windows(sentences, window_size=SEGMENT_WINDOW, stride=SEGMENT_STRIDE, max_gap=SEGMENT_MAX_GAP,
+                    max_duration=None):
+    """
+    Group consecutive sentences into overlapping windows. Each window keeps
+    the start of its first sentence, the end of its last, and the sentence
+    just before it as "previous" context. Its member sentences and the
+    position of the first are kept too, for sentence-level dedupe.
+
+    Windows never span a pause longer than max_gap (nor take context from
+    across one), and are cut short once they would last longer than
+    max_duration (default SEGMENT_MAX_DURATION per sentence), so a clip
+    never plays through a long silence.
+    """
+    window_size = max(1, window_size)
+    stride = max(1, stride)
+    if max_duration is None:
+        max_duration = SEGMENT_MAX_DURATION * window_size
+
+    windows = []
+    run_start = 0
+    for run_end in range(1, len(sentences) + 1):
+        if run_end < len(sentences) and sentences[run_end]["start"] - sentences[run_end - 1]["end"] <= max_gap:
+            continue
+        # sentences[run_start:run_end] is one stretch of speech without long pauses
+        i = run_start
+        while i < run_end:
+            members = [sentences[i]]
+            for sentence in sentences[i + 1:min(i + window_size, run_end)]:
+                if sentence["end"] - members[0]["start"] > max_duration:
+                    break
+                members.append(sentence)
+            windows.append({
+                "text": " ".join(s["text"] for s in members),
+                "start": members[0]["start"],
+                "end": members[-1]["end"],
+                "previous": sentences[i - 1] if i > run_start else None,
+                "sentences": members,
+                "first_sentence": i,
+            })
+            if i + len(members) >= run_end:
+                break
+            i += min(stride, len(members))
+        run_start = run_end
+    return windows
+
+
+def segment_transcript(transcript_entries, mode=SEGMENT_MODE, window_size=SEGMENT_WINDOW, stride=SEGMENT_STRIDE):
+    """
+    Return index-ready segments ({"text", "start", "end", "previous",
+    "sentences", "first_sentence"}) for a transcript. In raw mode every
+    caption entry is its own single sentence.
+    """
+    if mode == "raw":
+        segments = []
+        previous = None
+        for position, entry in enumerate(sorted(transcript_entries, key=lambda e: e["start"])):
+            segment = {
+                "text": entry["text"],
+                "start": entry["start"],
+                "end": entry["start"] + entry.get("duration", 0),
+            }
+            segments.append({**segment, "previous": previous, "sentences": [segment], "first_sentence": position})
+            previous = segment
+        return segments
+    return sliding_windows(merge_into_sentences(transcript_entries), window_size, stride)
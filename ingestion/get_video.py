@@ -1,13 +1,36 @@
 import os
 import re
+import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from googleapiclient.discovery import build
 from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.proxies import WebshareProxyConfig
 import json
 from pathlib import Path
 
+# Before the local imports and the settings below, which are read at import time
+load_dotenv()
+
+from proxy_pool import PROXY_FAILURES, ProxyPool, classify_failure
+from negative_cache import NegativeCache
+from crawl_scheduler import (
+    CRAWL_QUOTA_BUDGET,
+    CRAWL_TIME_BUDGET_MINUTES,
+    SEARCH_LIST_COST,
+    VIDEOS_LIST_COST,
+    CrawlScheduler,
+)
+
+FETCH_ATTEMPTS = int(os.getenv("FETCH_ATTEMPTS", "3"))
+# Transcript languages to download, in order of preference
+TRANSCRIPT_LANGUAGES = [code.strip() for code in os.getenv("TRANSCRIPT_LANGUAGES", "en").split(",") if code.strip()]
+
+try:
+    from langdetect import detect as detect_language
+except ImportError:  # langdetect is optional; without it unknown tracks stay "unknown"
+    detect_language = None
+
 def load_environment():
     load_dotenv()
     api_key = os.getenv("YOUTUBE_API_KEY")
@@ -63,8 +86,9 @@ def extract_video_id(url_or_id):
     print(f"Warning: Could not extract video ID from: {url_or_id}")
     return None
 
-def is_long_form_video(duration_iso):
-    duration = duration_iso[2:]
+def parse_duration_seconds(duration_iso):
+    """Convert an ISO 8601 video duration (e.g. "PT1H2M3S") to seconds."""
+    duration = (duration_iso or "")[2:]
     
     hours = re.search(r'(\d+)H', duration)
     minutes = re.search(r'(\d+)M', duration)
@@ -77,8 +101,10 @@ def is_long_form_video(duration_iso):
         total_seconds += int(minutes.group(1)) * 60
     if seconds:
         total_seconds += int(seconds.group(1))
-    
-    return 120 < total_seconds <= 1800
+    return total_seconds
+
+def is_long_form_video(duration_iso):
+    return 120 < parse_duration_seconds(duration_iso) <= 1800
 
 def get_youtube_service(api_key):
     return build("youtube", "v3", developerKey=api_key)
@@ -100,13 +126,20 @@ def save_processed_video_id(video_id, file_path="processed_videos.txt"):
     with open(file_path, 'a', encoding='utf-8') as f:
         f.write(f"{video_id}\n")
 
-def get_multiple_videos(youtube, channel_id, max_videos=10):
-    """Get up to max_videos long-form videos from a channel"""
+def get_multiple_videos(youtube, channel_id, max_videos=10, max_pages=None, skip_video_ids=None, usage=None):
+    """
+    Get up to max_videos long-form videos from a channel, newest first.
+    Videos in skip_video_ids are passed over instead of counting towards
+    max_videos. Quota units and candidates examined are added to usage.
+    """
     long_form_videos = []
     next_page_token = None
     search_limit = 50  # Search through more videos to find long-form ones
+    skip_video_ids = skip_video_ids or set()
+    usage = usage if usage is not None else {}
+    pages = 0
     
-    while len(long_form_videos) < max_videos:
+    while len(long_form_videos) < max_videos and (max_pages is None or pages < max_pages):
         # Search for videos from the channel
         search_params = {
             "part": "id",
@@ -120,40 +153,46 @@ def get_multiple_videos(youtube, channel_id, max_videos=10):
             search_params["pageToken"] = next_page_token
             
         response = youtube.search().list(**search_params).execute()
+        usage["quota_units"] = usage.get("quota_units", 0) + SEARCH_LIST_COST
+        pages += 1
         items = response.get("items", [])
         
         if not items:
             break
             
         # Get video IDs for batch processing
-        video_ids = [item["id"]["videoId"] for item in items]
-        
-        # Get video details in batch
-        video_details_response = youtube.videos().list(
-            part="contentDetails,snippet",
-            id=",".join(video_ids)
-        ).execute()
+        video_ids = [item["id"]["videoId"] for item in items if item["id"]["videoId"] not in skip_video_ids]
+        usage["candidates"] = usage.get("candidates", 0) + len(items)
         
-        # Filter for long-form videos
-        for video_detail in video_details_response.get("items", []):
-            if len(long_form_videos) >= max_videos:
-                break
-                
-            duration = video_detail["contentDetails"]["duration"]
-            if is_long_form_video(duration):
-                long_form_videos.append({
-                    "video_id": video_detail["id"],
-                    "title": video_detail["snippet"]["title"],
-                    "published_at": video_detail["snippet"]["publishedAt"]
-                })
+        if video_ids:
+            # Get video details in batch
+            video_details_response = youtube.videos().list(
+                part="contentDetails,snippet",
+                id=",".join(video_ids)
+            ).execute()
+            usage["quota_units"] += VIDEOS_LIST_COST
+            
+            # Filter for long-form videos
+            for video_detail in video_details_response.get("items", []):
+                if len(long_form_videos) >= max_videos:
+                    break
+                    
+                duration = video_detail["contentDetails"]["duration"]
+                if is_long_form_video(duration):
+                    long_form_videos.append({
+                        "video_id": video_detail["id"],
+                        "title": video_detail["snippet"]["title"],
+                        "published_at": video_detail["snippet"]["publishedAt"]
+                    })
         
         # Check if there are more pages
         next_page_token = response.get("nextPageToken")
         if not next_page_token:
             break
     
+    usage["long_form"] = usage.get("long_form", 0) + len(long_form_videos)
     if not long_form_videos:
-        raise ValueError("No long-form videos found for this channel (only shorts available).")
+        raise ValueError("No new long-form videos found for this channel.")
     
     return long_form_videos
 
@@ -209,23 +248,87 @@ def print_video_info(video_info):
     print("View count:", stats.get("viewCount"))
     print("Duration (ISO 8601):", content["duration"])
 
-def fetch_transcript(video_id, proxy_username, proxy_password):
-    try:
-        ytt_api = YouTubeTranscriptApi(
-            proxy_config=WebshareProxyConfig(
-                proxy_username=proxy_username,
-                proxy_password=proxy_password
-            )
-        )
-        transcript = ytt_api.fetch(video_id)
-        print("Transcripts available: True")
-        return transcript.to_raw_data()
-    except Exception as e:
-        print(f"Transcripts available: False - {str(e)}")
-        return None
+def video_metadata(video_info):
+    """The video fields stored on every indexed segment, for search filters."""
+    snippet = video_info.get("snippet", {})
+    return {
+        "title": snippet.get("title"),
+        "channel_id": snippet.get("channelId"),
+        "channel_title": snippet.get("channelTitle"),
+        "published_at": snippet.get("publishedAt"),
+        "duration_seconds": parse_duration_seconds(video_info.get("contentDetails", {}).get("duration")),
+    }
+
+
+def fetch_transcript(video_id, proxy_pool, attempts=FETCH_ATTEMPTS, languages=TRANSCRIPT_LANGUAGES):
+    """
+    Fetch the video's transcript through the pool's best available proxy.
+    The track list is read first: it is one light request, and it settles
+    disabled or missing transcripts before any transcript body is downloaded.
+    Blocks and network errors are retried on another proxy; failures that
+    describe the video (disabled, no transcript, unavailable) are final.
+
+    Returns {"video_id", "entries", "language_code", "languages", "failure", "error", "proxy"};
+    entries is None and failure holds the classified reason when it fails.
+    languages lists the track languages the video offers, when known.
+    """
+    result = {"video_id": video_id, "entries": None, "language_code": None, "languages": None,
+              "failure": None, "error": None, "proxy": None}
+    for _ in range(max(1, attempts)):
+        endpoint = proxy_pool.acquire()
+        started = time.monotonic()
+        failure = None
+        try:
+            # The API client keeps a requests session and is not thread-safe
+            ytt_api = YouTubeTranscriptApi(proxy_config=endpoint.proxy_config)
+            transcript_list = ytt_api.list(video_id)
+            result["languages"] = sorted({track.language_code for track in transcript_list})
+            transcript = transcript_list.find_transcript(languages).fetch()
+            result.update(entries=transcript.to_raw_data(), language_code=transcript.language_code,
+                          failure=None, error=None)
+        except Exception as e:
+            failure = classify_failure(e)
+            # The library's messages run to several paragraphs; its cause is the useful part
+            message = (getattr(e, "cause", None) or str(e)).strip()
+            result.update(failure=failure, error=message.splitlines()[0] if message else type(e).__name__)
+        finally:
+            proxy_pool.release(endpoint, failure, time.monotonic() - started)
+        result["proxy"] = endpoint.name
+        if failure not in PROXY_FAILURES:
+            break
+    return result
+
+
+def fetch_transcripts(video_ids, proxy_pool):
+    """Fetch transcripts concurrently, one worker per proxy slot. Yields results in input order."""
+    workers = max(1, min(proxy_pool.total_concurrency, len(video_ids)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(lambda video_id: fetch_transcript(video_id, proxy_pool), video_ids)
+
+
+def resolve_language_code(track_language_code, video_info=None, transcript_entries=None):
+    """
+    Pick the transcript language: the fetched track's code, then the video's
+    declared audio/default language, then detection on a sample of the text.
+    """
+    if track_language_code:
+        return track_language_code
+
+    snippet = (video_info or {}).get("snippet", {})
+    declared = snippet.get("defaultAudioLanguage") or snippet.get("defaultLanguage")
+    if declared:
+        return declared
+
+    if detect_language and transcript_entries:
+        sample = " ".join(entry.get("text", "") for entry in transcript_entries[:200])
+        try:
+            return detect_language(sample)
+        except Exception:
+            pass
+    return "unknown"
 
 
-def save_transcript_to_file(video_id, transcript_entries, language_code=None, output_dir=None):
+def save_transcript_to_file(video_id, transcript_entries, language_code=None, output_dir=None, video=None):
     base_dir = Path(__file__).resolve().parent
     transcripts_dir = Path(output_dir) if output_dir else base_dir / "transcripts"
     transcripts_dir.mkdir(parents=True, exist_ok=True)
@@ -235,6 +338,8 @@ def save_transcript_to_file(video_id, transcript_entries, language_code=None, ou
         "language_code": language_code or "unknown",
         "entries": transcript_entries,
     }
+    if video:
+        payload["video"] = video
 
     out_path = transcripts_dir / f"{video_id}.json"
     with out_path.open("w", encoding="utf-8") as f:
@@ -243,6 +348,33 @@ def save_transcript_to_file(video_id, transcript_entries, language_code=None, ou
     return str(out_path)
 
 
+def backfill_video_metadata(youtube, directories):
+    """
+    Add the "video" metadata block to saved transcripts that predate it,
+    50 videos per videos.list call. Re-push or reindex afterwards.
+    """
+    pending = {}
+    for directory in directories:
+        for json_file in sorted(Path(directory).glob("*.json")):
+            with json_file.open("r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if "video" not in payload and "video_id" in payload:
+                pending[payload["video_id"]] = (json_file, payload)
+
+    updated = 0
+    video_ids = list(pending)
+    for i in range(0, len(video_ids), 50):
+        response = youtube.videos().list(part="snippet,contentDetails", id=",".join(video_ids[i:i + 50])).execute()
+        for video_info in response.get("items", []):
+            json_file, payload = pending[video_info["id"]]
+            payload["video"] = video_metadata(video_info)
+            with json_file.open("w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=2)
+            updated += 1
+    print(f"Added video metadata to {updated} of {len(pending)} transcripts missing it")
+    return updated
+
+
 def parse_arguments():
     parser = argparse.ArgumentParser(
         description="Download YouTube video transcripts from channels or specific video IDs",
@@ -252,6 +384,8 @@ Examples:
   python get_video.py                    # Process both video_ids.txt and channels.txt (default)
   python get_video.py --videos-only      # Only process video_ids.txt
   python get_video.py --channels-only    # Only process channels.txt
+  python get_video.py --channels-only --quota-budget 3000 --time-budget 30
+  python get_video.py --backfill-metadata  # Add video metadata to transcripts saved without it
         """
     )
     
@@ -266,8 +400,92 @@ Examples:
         action='store_true',
         help='Only process channels from channels.txt'
     )
+    group.add_argument(
+        '--backfill-metadata',
+        action='store_true',
+        help='Add video metadata to saved transcripts (transcripts/ and store/) that lack it, then exit'
+    )
+    parser.add_argument(
+        '--quota-budget',
+        type=int,
+        default=CRAWL_QUOTA_BUDGET,
+        help=f'YouTube API quota units the channel crawl may spend (default: {CRAWL_QUOTA_BUDGET})'
+    )
+    parser.add_argument(
+        '--time-budget',
+        type=float,
+        default=CRAWL_TIME_BUDGET_MINUTES,
+        help=f'Minutes the channel crawl may run (default: {CRAWL_TIME_BUDGET_MINUTES:g})'
+    )
+    parser.add_argument(
+        '--proxies',
+        default='proxies.txt',
+        help='Proxy list, one "<url> [max_concurrency]" per line (default: proxies.txt, then PROXY_URLS, then Webshare credentials)'
+    )
     
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.quota_budget <= 0:
+        parser.error('--quota-budget must be positive')
+    if args.time_budget <= 0:
+        parser.error('--time-budget must be positive')
+    return args
+
+
+def skip_reason(video_id, processed_video_ids, negative_cache):
+    if video_id in processed_video_ids:
+        return "already processed"
+    cached = negative_cache.lookup(video_id, TRANSCRIPT_LANGUAGES)
+    if cached is not None:
+        return f"known {cached['reason']} until {cached['expires_at'][:10]}"
+    return None
+
+
+def process_videos(youtube, videos, proxy_pool, processed_video_ids, failure_counts, negative_cache):
+    """
+    Fetch and save transcripts for the videos not processed yet and not known
+    to lack one. Returns how many were saved.
+    """
+    pending = []
+    for video_data in videos:
+        reason = skip_reason(video_data["video_id"], processed_video_ids, negative_cache)
+        if reason:
+            print(f"Skipping {video_data['video_id']} - {reason}")
+        else:
+            pending.append(video_data["video_id"])
+
+    saved = 0
+    for result in fetch_transcripts(pending, proxy_pool):
+        video_id = result["video_id"]
+        if result["entries"]:
+            print(f"Transcripts available: True ({result['language_code']}, via {result['proxy']})")
+            # Get full video info for print_video_info
+            video_info = get_video_info(youtube, video_id)
+            print_video_info(video_info)
+            language_code = resolve_language_code(result["language_code"], video_info, result["entries"])
+            file_path = save_transcript_to_file(
+                video_id, result["entries"], language_code=language_code, video=video_metadata(video_info)
+            )
+            print(f"Transcript saved to: {file_path}")
+            processed_video_ids.add(video_id)
+            save_processed_video_id(video_id)
+            saved += 1
+        else:
+            failure_counts[result["failure"]] = failure_counts.get(result["failure"], 0) + 1
+            print(f"Failed to fetch transcript for video {video_id}: {result['failure']} - {result['error']}")
+            negative_cache.record(video_id, result["failure"], result["languages"], result["error"])
+        print("-" * 50)
+    negative_cache.save()
+    return saved
+
+
+def print_fetch_summary(proxy_pool, failure_counts):
+    print("\n=== Proxy Summary ===")
+    for stats in proxy_pool.summary():
+        quarantine = f", quarantined for {stats['quarantined_for']}s" if stats["quarantined_for"] else ""
+        print(f"{stats['proxy']}: {stats['successes']} ok, failures {stats['failures'] or 'none'}, "
+              f"success rate {stats['success_rate']:.0%}, latency {stats['latency_seconds']:.2f}s{quarantine}")
+    if failure_counts:
+        print("Failed videos by reason: " + ", ".join(f"{reason}={count}" for reason, count in sorted(failure_counts.items())))
 
 
 if __name__ == "__main__":
@@ -276,9 +494,18 @@ if __name__ == "__main__":
     
     api_key, proxy_username, proxy_password = load_environment()
     youtube = get_youtube_service(api_key)
+    if args.backfill_metadata:
+        base_dir = Path(__file__).resolve().parent
+        backfill_video_metadata(youtube, [d for d in (base_dir / "transcripts", base_dir / "store") if d.exists()])
+        exit(0)
+    proxy_pool = ProxyPool.from_config(args.proxies, proxy_username, proxy_password)
+    print(f"Using {len(proxy_pool.endpoints)} proxies ({proxy_pool.total_concurrency} concurrent fetches)")
     processed_video_ids = load_processed_video_ids()
+    negative_cache = NegativeCache()
+    print(f"Negative cache: {len(negative_cache)} videos known to have no usable transcript")
     
     total_videos_processed = 0
+    failure_counts = {}
     
     # Process specific video IDs if requested or if no flags are specified
     if not args.channels_only:
@@ -286,33 +513,18 @@ if __name__ == "__main__":
         if video_ids_file.exists():
             print("Processing specific video IDs from video_ids.txt...")
             video_ids = read_video_ids()
+            # Known-dead videos are dropped before they cost a videos.list call
+            dead_video_ids = negative_cache.dead_video_ids(TRANSCRIPT_LANGUAGES)
+            skipped = [video_id for video_id in video_ids if video_id in dead_video_ids]
+            if skipped:
+                print(f"Skipping {len(skipped)} videos with no usable transcript (negative cache)")
+                video_ids = [video_id for video_id in video_ids if video_id not in dead_video_ids]
             if video_ids:
                 videos = process_specific_videos(youtube, video_ids)
-                
-                videos_processed_from_ids = 0
-                for video_data in videos:
-                    video_id = video_data['video_id']
-                    if video_id in processed_video_ids:
-                        print(f"Skipping {video_id} - already processed")
-                        continue
-                    
-                    # Get full video info for print_video_info
-                    video_info = get_video_info(youtube, video_id)
-                    print_video_info(video_info)
-                    
-                    transcript_text = fetch_transcript(video_id, proxy_username, proxy_password)
-                    if transcript_text:
-                        file_path = save_transcript_to_file(video_id, transcript_text)
-                        print(f"Transcript saved to: {file_path}")
-                        processed_video_ids.add(video_id)
-                        save_processed_video_id(video_id)
-                        videos_processed_from_ids += 1
-                        total_videos_processed += 1
-                    else:
-                        print(f"Failed to fetch transcript for video {video_id}")
-                    
-                    print("-" * 50)
-                
+                videos_processed_from_ids = process_videos(
+                    youtube, videos, proxy_pool, processed_video_ids, failure_counts, negative_cache
+                )
+                total_videos_processed += videos_processed_from_ids
                 print(f"Processed {videos_processed_from_ids} specific videos from video_ids.txt")
             else:
                 print("No valid video IDs found in video_ids.txt")
@@ -331,42 +543,44 @@ if __name__ == "__main__":
                 print("No channel IDs found in channels.txt")
         else:
             print("\nProcessing channels from channels.txt...")
+            scheduler = CrawlScheduler(quota_budget=args.quota_budget, time_budget_seconds=args.time_budget * 60)
             
-            for channel_id in channel_ids:
-                print(f"\nProcessing channel: {channel_id}")
-                videos = get_multiple_videos(youtube, channel_id, max_videos=10)
-                
-                if not videos:
-                    print(f"No videos found for channel {channel_id}")
-                    continue
-                
-                print(f"Found {len(videos)} long-form videos (>= 10 minutes)")
+            for channel_id, max_videos, max_pages in scheduler.next_channels(channel_ids):
+                print(f"\nProcessing channel: {channel_id} (up to {max_videos} videos, {max_pages} search pages)")
+                usage = {}
+                started = time.monotonic()
+                try:
+                    videos = get_multiple_videos(
+                        youtube, channel_id, max_videos=max_videos, max_pages=max_pages,
+                        skip_video_ids=processed_video_ids | negative_cache.dead_video_ids(TRANSCRIPT_LANGUAGES),
+                        usage=usage,
+                    )
+                except ValueError as e:
+                    print(f"{e} ({channel_id})")
+                    videos = []
                 
                 videos_processed_this_channel = 0
-                
-                for video_data in videos:
-                    video_id = video_data['video_id']
-                    if video_id in processed_video_ids:
-                        print(f"Skipping {video_id} - already processed")
-                        continue
-                    
-                    # Get full video info for print_video_info
-                    video_info = get_video_info(youtube, video_id)
-                    print_video_info(video_info)
-                    
-                    transcript_text = fetch_transcript(video_id, proxy_username, proxy_password)
-                    if transcript_text:
-                        file_path = save_transcript_to_file(video_id, transcript_text)
-                        print(f"Transcript saved to: {file_path}")
-                        processed_video_ids.add(video_id)
-                        save_processed_video_id(video_id)
-                        videos_processed_this_channel += 1
-                        total_videos_processed += 1
-                    else:
-                        print(f"Failed to fetch transcript for video {video_id}")
-                    
-                    print("-" * 50)
-                
+                if videos:
+                    print(f"Found {len(videos)} new long-form videos")
+                    videos_processed_this_channel = process_videos(
+                        youtube, videos, proxy_pool, processed_video_ids, failure_counts, negative_cache
+                    )
+                    total_videos_processed += videos_processed_this_channel
+                # process_videos makes one videos.list call per saved transcript
+                scheduler.record(
+                    channel_id,
+                    quota_units=usage.get("quota_units", 0) + videos_processed_this_channel * VIDEOS_LIST_COST,
+                    fetch_seconds=time.monotonic() - started,
+                    candidates=usage.get("candidates", 0),
+                    long_form=usage.get("long_form", 0),
+                    new_transcripts=videos_processed_this_channel,
+                )
                 print(f"Processed {videos_processed_this_channel} videos from channel {channel_id}")
+            
+            print(f"\nCrawl used {scheduler.quota_spent} of {scheduler.quota_budget} quota units")
+            for row in scheduler.summary(channel_ids)[:10]:
+                print(f"  {row['channel_id']}: {row['new_transcripts']} transcripts over {row['crawls']} crawls, "
+                      f"{row['per_1000_units']} per 1000 units, {row['per_minute']} per minute")
     
+    print_fetch_summary(proxy_pool, failure_counts)
     print(f"\nTotal videos processed: {total_videos_processed}")
@@ -0,0 +1,81 @@
+import os
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Settings below are read at import time, whichever script imports this first
+load_dotenv()
+
+NEGATIVE_CACHE_FILE = os.getenv("NEGATIVE_CACHE_FILE", str(Path(__file__).resolve().parent / "negative_cache.json"))
+
+# How long each failure reason is trusted before the video is tried again.
+# Auto-generated captions can appear some time after upload, so missing
+# transcripts expire soonest; disabled captions rarely come back.
+NEGATIVE_CACHE_TTL_DAYS = {
+    "no_transcript": float(os.getenv("NEGATIVE_TTL_NO_TRANSCRIPT_DAYS", "14")),
+    "unavailable": float(os.getenv("NEGATIVE_TTL_UNAVAILABLE_DAYS", "30")),
+    "disabled": float(os.getenv("NEGATIVE_TTL_DISABLED_DAYS", "90")),
+}
+
+
+class NegativeCache:
+    """
+    Persistent record of videos whose transcript fetch failed for a reason
+    that lies with the video, not the proxy. Entries expire per reason, and a
+    "no_transcript" entry only applies while none of the requested languages
+    is among the languages the video was listed with.
+    """
+
+    def __init__(self, file_path=NEGATIVE_CACHE_FILE):
+        self.file_path = Path(file_path)
+        self.entries = {}
+        try:
+            with self.file_path.open("r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        self.prune()
+
+    def prune(self):
+        now = datetime.now(timezone.utc)
+        expired = [video_id for video_id, entry in self.entries.items()
+                   if datetime.fromisoformat(entry["expires_at"]) <= now]
+        for video_id in expired:
+            del self.entries[video_id]
+        return len(expired)
+
+    def lookup(self, video_id, languages=None):
+        """Return the cached failure for video_id if it still applies, else None."""
+        entry = self.entries.get(video_id)
+        if entry is None or datetime.fromisoformat(entry["expires_at"]) <= datetime.now(timezone.utc):
+            return None
+        if entry["reason"] == "no_transcript" and languages and set(languages) & set(entry.get("languages") or []):
+            return None
+        return entry
+
+    def dead_video_ids(self, languages=None):
+        return {video_id for video_id in self.entries if self.lookup(video_id, languages) is not None}
+
+    def record(self, video_id, reason, languages=None, error=None):
+        """Remember a failure; reasons without a TTL (blocked, network, ...) are ignored."""
+        if reason not in NEGATIVE_CACHE_TTL_DAYS:
+            return False
+        now = datetime.now(timezone.utc)
+        self.entries[video_id] = {
+            "reason": reason,
+            "languages": languages or [],
+            "error": error,
+            "checked_at": now.isoformat(),
+            "expires_at": (now + timedelta(days=NEGATIVE_CACHE_TTL_DAYS[reason])).isoformat(),
+        }
+        return True
+
+    def save(self):
+        tmp_file = self.file_path.with_suffix(self.file_path.suffix + ".tmp")
+        with tmp_file.open("w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_file, self.file_path)
+
+    def __len__(self):
+        return len(self.entries)
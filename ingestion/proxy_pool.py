@@ -0,0 +1,183 @@
+import os
+import time
+import threading
+import requests
+from youtube_transcript_api import (
+    AgeRestricted,
+    InvalidVideoId,
+    IpBlocked,
+    NoTranscriptFound,
+    RequestBlocked,
+    TranscriptsDisabled,
+    VideoUnavailable,
+    VideoUnplayable,
+    YouTubeRequestFailed,
+)
+from youtube_transcript_api.proxies import GenericProxyConfig, WebshareProxyConfig
+from dotenv import load_dotenv
+
+# Settings below are read at import time, whichever script imports this first
+load_dotenv()
+
+# Failure types for transcript fetches. Only "blocked" and "network" are the
+# proxy's fault; the others describe the video and count as a working proxy.
+FAILURE_BLOCKED = "blocked"
+FAILURE_NO_TRANSCRIPT = "no_transcript"
+FAILURE_DISABLED = "disabled"
+FAILURE_UNAVAILABLE = "unavailable"
+FAILURE_NETWORK = "network"
+FAILURE_UNKNOWN = "unknown"
+PROXY_FAILURES = {FAILURE_BLOCKED, FAILURE_NETWORK, FAILURE_UNKNOWN}
+
+PROXY_MAX_CONCURRENCY = int(os.getenv("PROXY_MAX_CONCURRENCY", "2"))
+PROXY_QUARANTINE_SECONDS = float(os.getenv("PROXY_QUARANTINE_SECONDS", "300"))
+PROXY_MAX_QUARANTINE_SECONDS = float(os.getenv("PROXY_MAX_QUARANTINE_SECONDS", "3600"))
+
+
+def classify_failure(error):
+    if isinstance(error, (IpBlocked, RequestBlocked)):
+        return FAILURE_BLOCKED
+    if isinstance(error, TranscriptsDisabled):
+        return FAILURE_DISABLED
+    if isinstance(error, NoTranscriptFound):
+        return FAILURE_NO_TRANSCRIPT
+    if isinstance(error, (VideoUnavailable, VideoUnplayable, AgeRestricted, InvalidVideoId)):
+        return FAILURE_UNAVAILABLE
+    if isinstance(error, (YouTubeRequestFailed, requests.exceptions.RequestException)):
+        return FAILURE_NETWORK
+    return FAILURE_UNKNOWN
+
+
+class ProxyEndpoint:
+    """One proxy with its concurrency cap and health statistics."""
+
+    def __init__(self, name, proxy_config, max_concurrency=PROXY_MAX_CONCURRENCY):
+        self.name = name
+        self.proxy_config = proxy_config
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.successes = 0
+        self.failures = {}
+        self.success_rate = 1.0  # exponentially weighted
+        self.latency = 1.0  # exponentially weighted seconds
+        self.consecutive_blocks = 0
+        self.quarantined_until = 0.0
+
+    def available(self, now):
+        return self.in_flight < self.max_concurrency and now >= self.quarantined_until
+
+    def score(self):
+        return self.success_rate / (1.0 + self.latency)
+
+
+class ProxyPool:
+    """
+    Hands out the healthiest proxy that has a free concurrency slot.
+    Blocked proxies are quarantined with exponential backoff; proxies whose
+    success rate collapses from network errors get a short quarantine too.
+    """
+
+    def __init__(self, endpoints, ewma_alpha=0.2):
+        if not endpoints:
+            raise ValueError("Proxy pool needs at least one endpoint")
+        self.endpoints = endpoints
+        self.ewma_alpha = ewma_alpha
+        self.condition = threading.Condition()
+
+    @classmethod
+    def from_config(cls, file_path="proxies.txt", proxy_username=None, proxy_password=None):
+        """
+        Load proxies from file_path (one "<url> [max_concurrency]" per line,
+        # comments allowed) or the comma-separated PROXY_URLS variable. Falls
+        back to the Webshare credentials as a single rotating endpoint.
+        """
+        endpoints = []
+        lines = []
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                lines = [line.strip() for line in f]
+        except FileNotFoundError:
+            lines = [url.strip() for url in os.getenv("PROXY_URLS", "").split(",")]
+
+        for line in lines:
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split()
+            max_concurrency = int(parts[1]) if len(parts) > 1 else PROXY_MAX_CONCURRENCY
+            endpoints.append(ProxyEndpoint(
+                name=parts[0].split("@")[-1],  # never print credentials
+                proxy_config=GenericProxyConfig(http_url=parts[0], https_url=parts[0]),
+                max_concurrency=max_concurrency,
+            ))
+
+        if not endpoints and proxy_username and proxy_password:
+            endpoints.append(ProxyEndpoint(
+                name="webshare",
+                proxy_config=WebshareProxyConfig(proxy_username=proxy_username, proxy_password=proxy_password),
+            ))
+        if not endpoints:
+            endpoints.append(ProxyEndpoint(name="direct", proxy_config=None))
+        return cls(endpoints)
+
+    @property
+    def total_concurrency(self):
+        return sum(endpoint.max_concurrency for endpoint in self.endpoints)
+
+    def acquire(self, timeout=None):
+        """Block until a proxy slot is free and return the best-scoring endpoint."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                now = time.time()
+                candidates = [e for e in self.endpoints if e.available(now)]
+                if candidates:
+                    endpoint = max(candidates, key=lambda e: e.score())
+                    endpoint.in_flight += 1
+                    return endpoint
+
+                # Wait for a release, or for the earliest quarantine to expire
+                waits = [e.quarantined_until - now for e in self.endpoints
+                         if e.quarantined_until > now and e.in_flight < e.max_concurrency]
+                wait = min(waits) if waits else None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("No proxy available")
+                    wait = remaining if wait is None else min(wait, remaining)
+                self.condition.wait(wait)
+
+    def release(self, endpoint, failure=None, latency=None):
+        with self.condition:
+            endpoint.in_flight -= 1
+            proxy_ok = failure not in PROXY_FAILURES
+            endpoint.success_rate += self.ewma_alpha * ((1.0 if proxy_ok else 0.0) - endpoint.success_rate)
+            if latency is not None and proxy_ok:
+                endpoint.latency += self.ewma_alpha * (latency - endpoint.latency)
+
+            if proxy_ok:
+                endpoint.successes += 1
+                endpoint.consecutive_blocks = 0
+            else:
+                endpoint.failures[failure] = endpoint.failures.get(failure, 0) + 1
+                if failure == FAILURE_BLOCKED:
+                    endpoint.consecutive_blocks += 1
+                    backoff = PROXY_QUARANTINE_SECONDS * 2 ** (endpoint.consecutive_blocks - 1)
+                    self._quarantine(endpoint, min(backoff, PROXY_MAX_QUARANTINE_SECONDS), "blocked")
+                elif endpoint.success_rate < 0.2:
+                    self._quarantine(endpoint, PROXY_QUARANTINE_SECONDS / 5, "unhealthy")
+            self.condition.notify_all()
+
+    def _quarantine(self, endpoint, seconds, reason):
+        endpoint.quarantined_until = time.time() + seconds
+        print(f"Proxy {endpoint.name} quarantined for {seconds:.0f}s ({reason})")
+
+    def summary(self):
+        now = time.time()
+        return [{
+            "proxy": e.name,
+            "successes": e.successes,
+            "failures": dict(e.failures),
+            "success_rate": round(e.success_rate, 3),
+            "latency_seconds": round(e.latency, 3),
+            "quarantined_for": max(0, round(e.quarantined_until - now)),
+        } for e in self.endpoints]